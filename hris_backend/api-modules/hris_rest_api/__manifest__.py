@@ -10,6 +10,7 @@
     'website': 'https://www.yourcompany.com',    'depends': [
         'base',
         'hr',
+        'hr_attendance',
     ],
     'data': [
         'security/ir.model.access.csv',
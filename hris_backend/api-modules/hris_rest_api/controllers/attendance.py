@@ -1,10 +1,9 @@
 import json
 import logging
-from datetime import datetime, date, timedelta, time
+from datetime import datetime, date, timedelta
 import pytz
 from odoo import http
 from odoo.http import request
-import calendar
 
 _logger = logging.getLogger(__name__)
 
@@ -75,25 +74,19 @@ class AttendanceController(http.Controller):
             # First check if there's an Authorization header
             auth_header = request.httprequest.headers.get('Authorization', '')
             if auth_header.startswith('Bearer '):
-                session_token = auth_header.replace('Bearer ', '')
-                _logger.info(f"Attendance request with token: {session_token}")
+                session_token = auth_header[len('Bearer '):].strip()
                 
-                # For development: Get user from session token (simplified approach)
-                # This should match the logic from auth controller
+                # Resolve the API token issued by /api/auth/login, from the
+                # in-process token cache when possible
                 try:
-                    # Find the most recent active user based on session token pattern
-                    # In a real implementation, you'd store and validate session tokens properly
-                    recent_user = request.env['res.users'].sudo().search([
-                        ('active', '=', True),
-                        ('login', '!=', False)
-                    ], order='login_date desc', limit=1)
-                    
-                    if recent_user:
-                        _logger.info(f"Using session user: {recent_user.name} (ID: {recent_user.id})")
-                        return recent_user
+                    resolved = request.env['hris.api.token'].sudo()._resolve(session_token)
+                    if resolved:
+                        return request.env['res.users'].sudo().browse(resolved[0])
+                    return None
                         
                 except Exception as e:
-                    _logger.error(f"Error finding user for session token: {str(e)}")
+                    _logger.error(f"Error resolving API token: {str(e)}")
+                    return None
             
             # Check if there's a valid session without Authorization header
             if hasattr(request, 'session') and request.session.uid:
@@ -134,10 +127,6 @@ class AttendanceController(http.Controller):
             if not user:
                 return self._error_response("Authentication required", 401)
             
-            # Get current date info
-            today = datetime.now().date()
-            current_month_start = today.replace(day=1)
-            
             # Check if user has employee record
             employee = request.env['hr.employee'].sudo().search([
                 ('user_id', '=', user.id)
@@ -151,87 +140,43 @@ class AttendanceController(http.Controller):
                     'work_email': user.email,
                 })
             
-            # Get today's attendance
-            today_attendance = request.env['hr.attendance'].sudo().search([
-                ('employee_id', '=', employee.id),
-                ('check_in', '>=', today.strftime('%Y-%m-%d 00:00:00')),
-                ('check_in', '<', (today + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00'))
-            ], order='check_in desc', limit=1)
+            # Get today's date in the employee timezone
+            daily_model = request.env['hr.attendance.daily'].sudo()
+            today = daily_model._get_local_date(employee, datetime.utcnow())
+            current_month_start = today.replace(day=1)
             
-            # Calculate current status
-            is_checked_in = bool(today_attendance and not today_attendance.check_out)
-            check_in_time = self._format_time_local(today_attendance.check_in) if today_attendance and today_attendance.check_in else ''
-            check_out_time = self._format_time_local(today_attendance.check_out) if today_attendance and today_attendance.check_out else ''
-            
-            # Calculate working hours
-            working_hours = '00:00:00'
-            if today_attendance and today_attendance.check_in:
-                if today_attendance.check_out:
-                    # Calculate actual working hours using local times
-                    check_in = today_attendance.check_in
-                    check_out = today_attendance.check_out
-                    
-                    # Convert to local timezone if needed
-                    indonesia_tz = pytz.timezone('Asia/Jakarta')
-                    if check_in.tzinfo is None:
-                        check_in = indonesia_tz.localize(check_in)
-                    else:
-                        check_in = check_in.astimezone(indonesia_tz)
-                        
-                    if check_out.tzinfo is None:
-                        check_out = indonesia_tz.localize(check_out)
-                    else:
-                        check_out = check_out.astimezone(indonesia_tz)
-                    
-                    duration = check_out - check_in
-                    hours = int(duration.total_seconds() // 3600)
-                    minutes = int((duration.total_seconds() % 3600) // 60)
-                    seconds = int(duration.total_seconds() % 60)
-                    working_hours = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                else:
-                    # Calculate current working hours (still checked in)
-                    check_in = today_attendance.check_in
-                    now = self._get_current_datetime_local()
-                    
-                    # Convert check_in to local timezone if needed
-                    indonesia_tz = pytz.timezone('Asia/Jakarta')
-                    if check_in.tzinfo is None:
-                        check_in = indonesia_tz.localize(check_in)
-                    else:
-                        check_in = check_in.astimezone(indonesia_tz)
-                    
-                    duration = now - check_in
-                    hours = int(duration.total_seconds() // 3600)
-                    minutes = int((duration.total_seconds() % 3600) // 60)
-                    seconds = int(duration.total_seconds() % 60)
-                    working_hours = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            # Get monthly attendance summary
-            monthly_attendances = request.env['hr.attendance'].sudo().search([
+            # Read the daily summaries of the month in one indexed range read
+            summaries = daily_model.search([
                 ('employee_id', '=', employee.id),
-                ('check_in', '>=', current_month_start.strftime('%Y-%m-%d 00:00:00')),
-                ('check_in', '<', datetime.now().strftime('%Y-%m-%d 23:59:59'))
+                ('date', '>=', current_month_start),
+                ('date', '<=', today)
             ])
+            today_summary = summaries.filtered(lambda s: s.date == today)[:1]
+            
+            # Calculate current status
+            is_checked_in = bool(today_summary.open_check_in)
+            check_in_time = self._format_time_local(pytz.utc.localize(today_summary.first_check_in)) if today_summary.first_check_in else ''
+            check_out_time = self._format_time_local(pytz.utc.localize(today_summary.last_check_out)) if today_summary.last_check_out and not is_checked_in else ''
+            
+            # Calculate working hours, including the attendance still open
+            working_seconds = today_summary.worked_seconds
+            if is_checked_in:
+                working_seconds += max(0, int((datetime.utcnow() - today_summary.open_check_in).total_seconds()))
+            hours = working_seconds // 3600
+            minutes = (working_seconds % 3600) // 60
+            seconds = working_seconds % 60
+            working_hours = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
             
             # Calculate attendance statistics
-            present_days = len(set(att.check_in.date() for att in monthly_attendances if att.check_in))
+            present_days = len(summaries)
             
-            # Calculate working days in current month (assuming 5-day work week)
-            total_days = calendar.monthrange(today.year, today.month)[1]
-            working_days = 0
-            for day in range(1, min(total_days + 1, today.day + 1)):  # Only count up to today
-                date_check = today.replace(day=day)
-                if date_check.weekday() < 5:  # Monday to Friday
-                    working_days += 1
+            # Calculate working days of the month up to today from the employee calendar
+            working_days = daily_model._get_working_days(employee, current_month_start, today)
             
             absent_days = max(0, working_days - present_days)
             
-            # Calculate late arrivals (assuming 9:00 AM is standard time)
-            late_days = 0
-            standard_time = time(9, 0)  # 9:00 AM
-            for attendance in monthly_attendances:
-                if attendance.check_in and attendance.check_in.time() > standard_time:
-                    late_days += 1
+            # Late arrivals are flagged against the employee calendar
+            late_days = len(summaries.filtered('is_late'))
             
             dashboard_data = {
                 'user_info': {
@@ -326,6 +271,9 @@ class AttendanceController(http.Controller):
                                 SET check_out = %s 
                                 WHERE id = %s
                             """, (check_out_utc, existing_attendance.id))
+                            # The raw update bypasses the hr.attendance hooks
+                            existing_attendance.invalidate_recordset(['check_out'], flush=False)
+                            existing_attendance._refresh_daily_summary()
                             request.env.cr.commit()
                         
                         # Force commit the transaction
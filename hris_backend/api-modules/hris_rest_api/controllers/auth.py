@@ -46,6 +46,13 @@ class AuthController(http.Controller):
             status=status
         )
 
+    def _get_bearer_token(self):
+        """Return the API token of the Authorization header, if any"""
+        auth_header = request.httprequest.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            return auth_header[len('Bearer '):].strip()
+        return None
+
     @http.route('/api/auth/login', type='http', auth='none', methods=['POST', 'OPTIONS'], csrf=False)
     def login(self):
         """Login endpoint with proper session management"""
@@ -69,6 +76,7 @@ class AuthController(http.Controller):
                     # Get user info
                     user = request.env['res.users'].sudo().browse(uid)
                     employee = request.env['hr.employee'].sudo().search([('user_id', '=', user.id)], limit=1)
+                    token, expires_at = request.env['hris.api.token'].sudo()._issue(user, employee)
                     
                     # Create session data
                     user_data = {
@@ -76,7 +84,9 @@ class AuthController(http.Controller):
                         'username': user.login,
                         'name': user.name,
                         'email': user.email,
-                        'session_token': request.session.sid,
+                        'session_token': token,
+                        'access_token': token,
+                        'expires_at': expires_at.isoformat(),
                         'login_time': datetime.now().isoformat(),
                         'employee_id': employee.id if employee else None,
                         'employee_name': employee.name if employee else None,
@@ -108,10 +118,10 @@ class AuthController(http.Controller):
             return request.make_response('', headers=self._cors_headers())
         
         try:
-            # Get session token from Authorization header
-            auth_header = request.httprequest.headers.get('Authorization', '')
-            if auth_header.startswith('Bearer '):
-                session_token = auth_header.replace('Bearer ', '')
+            # Revoke the API token of the Authorization header
+            session_token = self._get_bearer_token()
+            if session_token:
+                request.env['hris.api.token'].sudo()._revoke(session_token)
                 # Try to invalidate the session if token exists
                 try:
                     if hasattr(request, 'session') and request.session:
@@ -133,24 +143,21 @@ class AuthController(http.Controller):
         
         try:
             # Get session token from Authorization header
-            auth_header = request.httprequest.headers.get('Authorization', '')
-            if not auth_header.startswith('Bearer '):
+            session_token = self._get_bearer_token()
+            if not session_token:
                 return self._error_response("Session token required", 401)
             
-            session_token = auth_header.replace('Bearer ', '')
-            _logger.info(f"Profile request with token: {session_token}")
+            resolved = request.env['hris.api.token'].sudo()._resolve(session_token)
+            if not resolved:
+                return self._error_response("Invalid or expired token", 401)
+            uid, employee_id = resolved
             
-            # For development: return a mock profile based on the last logged in user
-            # In production, you would validate the session token properly
             try:
-                # Find the most recent active user (simplified for development)
-                recent_user = request.env['res.users'].sudo().search([
-                    ('active', '=', True),
-                    ('login', '!=', False)
-                ], order='login_date desc', limit=1)
+                recent_user = request.env['res.users'].sudo().browse(uid)
                 
                 if recent_user:
-                    employee = request.env['hr.employee'].sudo().search([('user_id', '=', recent_user.id)], limit=1)
+                    employee = request.env['hr.employee'].sudo().browse(employee_id) if employee_id \
+                        else request.env['hr.employee']
                     
                     profile_data = {
                         'user_id': recent_user.id,
@@ -1 +1,4 @@
 # Models for HRIS REST API
+from . import hris_api_token
+from . import hr_attendance_daily
+from . import hr_attendance
@@ -0,0 +1,44 @@
+from odoo import api, models
+
+# Fields of the attendances the daily summaries are computed from
+DAILY_SUMMARY_FIELDS = {'employee_id', 'check_in', 'check_out'}
+
+
+class HrAttendance(models.Model):
+    _inherit = 'hr.attendance'
+
+    def _get_daily_keys(self):
+        """Return the (employee_id, date) keys of the daily summaries
+        the attendances are part of"""
+        daily = self.env['hr.attendance.daily']
+        return {(attendance.employee_id.id,
+                 daily._get_local_date(attendance.employee_id,
+                                       attendance.check_in))
+                for attendance in self
+                if attendance.employee_id and attendance.check_in}
+
+    def _refresh_daily_summary(self, keys=None):
+        """Recompute the daily summaries of the attendances, and of the
+        extra keys they were part of before a change"""
+        keys = (keys or set()) | self._get_daily_keys()
+        self.env['hr.attendance.daily'].sudo()._refresh(keys)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        attendances = super(HrAttendance, self).create(vals_list)
+        attendances._refresh_daily_summary()
+        return attendances
+
+    def write(self, vals):
+        if not DAILY_SUMMARY_FIELDS & set(vals):
+            return super(HrAttendance, self).write(vals)
+        keys = self._get_daily_keys()
+        res = super(HrAttendance, self).write(vals)
+        self._refresh_daily_summary(keys)
+        return res
+
+    def unlink(self):
+        keys = self._get_daily_keys()
+        res = super(HrAttendance, self).unlink()
+        self.env['hr.attendance.daily'].sudo()._refresh(keys)
+        return res
@@ -0,0 +1,195 @@
+from datetime import timedelta
+
+import pytz
+
+from odoo import api, fields, models
+
+# Timezone of the employees without one, as assumed by the mobile app
+DEFAULT_TZ = 'Asia/Jakarta'
+# Start of the day (Monday to Friday) of the employees without calendar
+DEFAULT_DAY_START = 9.0
+# Employees backfilled per batch when the module is installed
+BACKFILL_CHUNK_SIZE = 1000
+
+
+class HrAttendanceDaily(models.Model):
+    _name = 'hr.attendance.daily'
+    _description = 'Daily Attendance Summary'
+    _order = 'date desc, employee_id'
+
+    employee_id = fields.Many2one('hr.employee', required=True,
+                                  ondelete='cascade', readonly=True)
+    date = fields.Date(required=True, readonly=True,
+                       help="Day of the first check-in, in the employee timezone")
+    first_check_in = fields.Datetime(readonly=True)
+    last_check_out = fields.Datetime(readonly=True)
+    open_check_in = fields.Datetime(
+        readonly=True, help="Check-in of the attendance still open, if any")
+    worked_seconds = fields.Integer(
+        readonly=True, help="Time worked by the closed attendances of the day")
+    attendance_count = fields.Integer(readonly=True)
+    is_late = fields.Boolean(
+        readonly=True,
+        help="First check-in after the start of the day in the employee calendar")
+
+    _sql_constraints = [
+        ('employee_date_uniq', 'unique(employee_id, date)',
+         'There is one attendance summary per employee and day.'),
+    ]
+
+    def init(self):
+        """Backfill the summaries from the existing attendances"""
+        self.env.cr.execute("SELECT 1 FROM hr_attendance_daily LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        self.env.cr.execute(
+            "SELECT DISTINCT employee_id FROM hr_attendance ORDER BY employee_id")
+        employee_ids = [row[0] for row in self.env.cr.fetchall()]
+        for index in range(0, len(employee_ids), BACKFILL_CHUNK_SIZE):
+            self._refresh_employees(
+                employee_ids[index:index + BACKFILL_CHUNK_SIZE])
+
+    @api.model
+    def _get_local_date(self, employee, dt):
+        """Return the day of a UTC datetime in the employee timezone"""
+        tz = pytz.timezone(employee.tz or DEFAULT_TZ)
+        return pytz.utc.localize(dt).astimezone(tz).date()
+
+    @api.model
+    def _get_day_start(self, employee, day):
+        """Return the hour the employee is expected at work on the day,
+        or None if the day is not worked"""
+        calendar = employee.resource_calendar_id
+        if not calendar:
+            return DEFAULT_DAY_START if day.weekday() < 5 else None
+        attendances = calendar.attendance_ids.filtered(
+            lambda a: a.dayofweek == str(day.weekday())
+            and not a.display_type and a.day_period != 'lunch'
+            and (not a.date_from or a.date_from <= day)
+            and (not a.date_to or a.date_to >= day))
+        if calendar.two_weeks_calendar:
+            week_type = str(self.env['resource.calendar.attendance'
+                                     ].get_week_type(day))
+            attendances = attendances.filtered(
+                lambda a: a.week_type == week_type)
+        return min(attendances.mapped('hour_from')) if attendances else None
+
+    @api.model
+    def _get_working_days(self, employee, date_from, date_to):
+        """Return the number of worked days of the employee calendar
+        between both dates, included"""
+        working_days = 0
+        day = date_from
+        while day <= date_to:
+            if self._get_day_start(employee, day) is not None:
+                working_days += 1
+            day += timedelta(days=1)
+        return working_days
+
+    @api.model
+    def _refresh_employees(self, employee_ids):
+        """Recompute all the summaries of the employees"""
+        if not employee_ids:
+            return
+        self.env['hr.attendance'].flush_model(
+            ['employee_id', 'check_in', 'check_out'])
+        self.env.cr.execute("""
+            SELECT a.employee_id, a.check_in
+            FROM hr_attendance a
+            WHERE a.employee_id IN %s""", (tuple(employee_ids),))
+        employees = self.env['hr.employee'].browse(employee_ids)
+        employee_by_id = {employee.id: employee for employee in employees}
+        keys = {(employee_id, self._get_local_date(
+            employee_by_id[employee_id], check_in))
+            for employee_id, check_in in self.env.cr.fetchall()}
+        self.env.cr.execute(
+            "DELETE FROM hr_attendance_daily WHERE employee_id IN %s",
+            (tuple(employee_ids),))
+        self._refresh(keys)
+
+    @api.model
+    def _refresh(self, keys):
+        """Recompute the summaries of the given (employee_id, date) keys
+        from their attendances, in one aggregate query upserting their rows.
+        Keys left without attendance lose their summary."""
+        keys = {(employee_id, day) for employee_id, day in keys
+                if employee_id and day}
+        if not keys:
+            return
+        self.env['hr.attendance'].flush_model(
+            ['employee_id', 'check_in', 'check_out'])
+        self.env['hr.employee'].flush_model(['resource_id'])
+        employee_ids = [key[0] for key in keys]
+        dates = [key[1] for key in keys]
+        self.env.cr.execute("""
+            WITH keys AS (
+                SELECT * FROM UNNEST(%s::int[], %s::date[])
+                    AS k(employee_id, date)
+            ), attendances AS (
+                SELECT a.employee_id, a.check_in, a.check_out,
+                    (a.check_in AT TIME ZONE 'UTC'
+                        AT TIME ZONE COALESCE(r.tz, %s))::date AS date
+                FROM hr_attendance a
+                JOIN hr_employee e ON e.id = a.employee_id
+                LEFT JOIN resource_resource r ON r.id = e.resource_id
+                JOIN keys k ON k.employee_id = a.employee_id
+                    AND a.check_in >= k.date - 1 AND a.check_in < k.date + 2
+            )
+            SELECT a.employee_id, a.date, MIN(a.check_in), MAX(a.check_out),
+                MAX(a.check_in) FILTER (WHERE a.check_out IS NULL),
+                COALESCE(SUM(EXTRACT(EPOCH FROM a.check_out - a.check_in)), 0),
+                COUNT(*)
+            FROM attendances a
+            JOIN keys k ON k.employee_id = a.employee_id AND k.date = a.date
+            GROUP BY a.employee_id, a.date""", (employee_ids, dates, DEFAULT_TZ))
+        rows = self.env.cr.fetchall()
+        employees = self.env['hr.employee'].browse(list(set(employee_ids)))
+        employee_by_id = {employee.id: employee for employee in employees}
+        values = []
+        for (employee_id, day, first_check_in, last_check_out, open_check_in,
+             worked_seconds, attendance_count) in rows:
+            employee = employee_by_id[employee_id]
+            day_start = self._get_day_start(employee, day)
+            tz = pytz.timezone(employee.tz or DEFAULT_TZ)
+            local_check_in = pytz.utc.localize(first_check_in).astimezone(tz)
+            check_in_hour = (local_check_in.hour + local_check_in.minute / 60.0
+                             + local_check_in.second / 3600.0)
+            is_late = day_start is not None and check_in_hour > day_start
+            values.append((employee_id, day, first_check_in, last_check_out,
+                           open_check_in, int(worked_seconds),
+                           attendance_count, is_late))
+        # Drop the summaries of the days left without attendance
+        stale = keys - {(value[0], value[1]) for value in values}
+        if stale:
+            self.env.cr.execute("""
+                DELETE FROM hr_attendance_daily d
+                USING UNNEST(%s::int[], %s::date[]) AS k(employee_id, date)
+                WHERE d.employee_id = k.employee_id AND d.date = k.date""",
+                                ([key[0] for key in stale],
+                                 [key[1] for key in stale]))
+        # Upsert the others, the concurrent refreshes of a day overwriting
+        # each other instead of failing on the unique constraint
+        if values:
+            columns = list(zip(*values))
+            self.env.cr.execute("""
+                INSERT INTO hr_attendance_daily (employee_id, date,
+                    first_check_in, last_check_out, open_check_in,
+                    worked_seconds, attendance_count, is_late,
+                    create_uid, create_date, write_uid, write_date)
+                SELECT v.*, %s, NOW() AT TIME ZONE 'UTC',
+                    %s, NOW() AT TIME ZONE 'UTC'
+                FROM UNNEST(%s::int[], %s::date[], %s::timestamp[],
+                    %s::timestamp[], %s::timestamp[], %s::int[], %s::int[],
+                    %s::bool[]) AS v
+                ON CONFLICT (employee_id, date) DO UPDATE SET
+                    first_check_in = EXCLUDED.first_check_in,
+                    last_check_out = EXCLUDED.last_check_out,
+                    open_check_in = EXCLUDED.open_check_in,
+                    worked_seconds = EXCLUDED.worked_seconds,
+                    attendance_count = EXCLUDED.attendance_count,
+                    is_late = EXCLUDED.is_late,
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date""",
+                                (self.env.uid, self.env.uid,
+                                 *[list(column) for column in columns]))
+        self.invalidate_model()
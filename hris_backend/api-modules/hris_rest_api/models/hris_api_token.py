@@ -0,0 +1,131 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Lifetime of the issued tokens
+TOKEN_LIFETIME = timedelta(days=7)
+# Tokens resolved by the in-process cache, and how long they are trusted
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 60
+
+
+class TokenCache:
+    """Bounded LRU cache with TTL, resolving token hashes to
+    (uid, employee_id) in the worker process without any query.
+    Revoked tokens are evicted from the worker revoking them, the other
+    workers trusting their entry for TOKEN_CACHE_TTL seconds at most."""
+
+    def __init__(self, size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value of the key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Cache the value of the key for ttl seconds at most"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Evict the key from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+token_cache = TokenCache()
+
+
+class HrisApiToken(models.Model):
+    _name = 'hris.api.token'
+    _description = 'HRIS API Token'
+    _order = 'id desc'
+
+    user_id = fields.Many2one('res.users', required=True, ondelete='cascade',
+                              index=True)
+    employee_id = fields.Many2one('hr.employee', ondelete='set null')
+    token_hash = fields.Char(required=True, index=True, readonly=True)
+    expires_at = fields.Datetime(required=True, index=True)
+
+    _sql_constraints = [
+        ('token_hash_uniq', 'unique(token_hash)', 'The token already exists.'),
+    ]
+
+    @staticmethod
+    def _hash_token(token):
+        """Only the SHA-256 hash of the tokens is stored"""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @api.model
+    def _issue(self, user, employee=None):
+        """Create a token for the user and return it with its expiry"""
+        token = secrets.token_urlsafe(32)
+        expires_at = fields.Datetime.now() + TOKEN_LIFETIME
+        self.sudo().create({
+            'user_id': user.id,
+            'employee_id': employee.id if employee else False,
+            'token_hash': self._hash_token(token),
+            'expires_at': expires_at,
+        })
+        return token, expires_at
+
+    @api.model
+    def _resolve(self, token):
+        """Return the (uid, employee_id) of a valid token, or None.
+        Cache hits do not query the database."""
+        if not token:
+            return None
+        token_hash = self._hash_token(token)
+        cached = token_cache.get(token_hash)
+        if cached is not None:
+            return cached
+        self.env.cr.execute("""
+            SELECT t.user_id, t.employee_id, t.expires_at
+            FROM hris_api_token t
+            JOIN res_users u ON u.id = t.user_id
+            WHERE t.token_hash = %s AND t.expires_at > NOW() AT TIME ZONE 'UTC'
+            AND u.active""", (token_hash,))
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        uid, employee_id, expires_at = row
+        value = (uid, employee_id)
+        token_cache.set(token_hash, value, ttl=(
+            expires_at - fields.Datetime.now()).total_seconds())
+        return value
+
+    @api.model
+    def _revoke(self, token):
+        """Delete a token and evict it from the cache"""
+        token_hash = self._hash_token(token)
+        token_cache.pop(token_hash)
+        self.sudo().search([('token_hash', '=', token_hash)]).unlink()
+
+    @api.model
+    def _gc_expired_tokens(self):
+        """Cron entry point: delete the expired tokens"""
+        self.sudo().search(
+            [('expires_at', '<=', fields.Datetime.now())]).unlink()
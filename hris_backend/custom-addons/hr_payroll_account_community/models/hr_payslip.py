@@ -46,14 +46,15 @@ class HrPayslip(models.Model):
                               help="Accounting entry associated with "
                                    "this record")
 
-    @api.model
-    def create(self, vals):
-        """Create a new payroll slip.This method is called when creating a
-            new payroll slip.It checks if 'journal_id' is present in the
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Create new payroll slips.This method is called when creating
+            payroll slips.It checks if 'journal_id' is present in the
             context and, if so, sets the 'journal_id' field in the values."""
         if 'journal_id' in self.env.context:
-            vals['journal_id'] = self.env.context.get('journal_id')
-        return super(HrPayslip, self).create(vals)
+            for vals in vals_list:
+                vals['journal_id'] = self.env.context.get('journal_id')
+        return super(HrPayslip, self).create(vals_list)
 
     @api.onchange('contract_id')
     def onchange_contract_id(self):
@@ -72,8 +73,18 @@ class HrPayslip(models.Model):
         method cancels the current payroll slip by canceling its associated
         accounting entries (moves). If a move is in the 'posted' state, it is
         first uncanceled, then all moves are unlinked. Finally, the method
-        calls the parent class's action_payslip_cancel method."""
+        calls the parent class's action_payslip_cancel method. An entry
+        shared by several payslips can only be cancelled with all of them."""
         moves = self.mapped('move_id')
+        shared_slips = self.search([('move_id', 'in', moves.ids),
+                                    ('id', 'not in', self.ids)])
+        if shared_slips:
+            raise UserError(
+                _('The accounting entries %s are shared with other payslips '
+                  '(%s), cancel them all together.') % (
+                    ', '.join(shared_slips.mapped('move_id.name')),
+                    ', '.join(shared_slips.mapped(
+                        lambda slip: slip.number or slip.name))))
         moves.filtered(lambda x: x.state == 'posted').button_cancel()
         moves.unlink()
         return super(HrPayslip, self).action_payslip_cancel()
@@ -83,100 +94,168 @@ class HrPayslip(models.Model):
          method is called when marking a payroll slip as done. It calculates
          the accounting entries based on the salary details, creates a move
          (journal entry),and posts it. If necessary, adjustment entries are
-         added to balance the debit and credit amounts."""
+         added to balance the debit and credit amounts. The
+         payslip_move_grouping key of the context groups the payslips into
+         one move per journal and date, optionally per partner, all the moves
+         being created and posted at once."""
         res = super(HrPayslip, self).action_payslip_done()
+        grouping = self.env.context.get('payslip_move_grouping') or 'slip'
+        slips_by_move = {}
         for slip in self:
-            line_ids = []
-            debit_sum = 0.0
-            credit_sum = 0.0
-            name = _('Payslip of %s') % slip.employee_id.name
+            if grouping == 'slip':
+                key = slip.id
+            else:
+                key = (slip.journal_id, slip.date or slip.date_to,
+                       slip.company_id)
+            slips_by_move[key] = slips_by_move.get(key, self.browse()) | slip
+        move_vals_list = [
+            slips._prepare_move_values(
+                per_partner=grouping != 'journal_date')
+            for slips in slips_by_move.values()]
+        for move_vals in move_vals_list:
+            if not move_vals['line_ids']:
+                raise UserError(
+                    _("As you installed the payroll accounting module you have"
+                      " to choose Debit and Credit account for at least one "
+                      "salary rule in the chosen Salary Structure."))
+        moves = self.env['account.move'].create(move_vals_list)
+        for slips, move in zip(slips_by_move.values(), moves):
+            slips.write({'move_id': move.id,
+                         'date': slips[0].date or slips[0].date_to})
+        moves.action_post()
+        return res
+
+    def _prepare_move_values(self, per_partner=True):
+        """Prepare the values of the journal entry of the payslips, which
+        share the same journal, date and company. The journal items of
+        several payslips are summed per salary rule and account, and per
+        partner if per_partner is set."""
+        slip = self[0]
+        journal = slip.journal_id
+        date = slip.date or slip.date_to
+        line_vals = []
+        for payslip in self:
+            line_vals += payslip._prepare_move_line_values()
+        if len(self) == 1:
             move_dict = {
-                'narration': name,
+                'narration': _('Payslip of %s') % slip.employee_id.name,
                 'ref': slip.number,
-                'journal_id': slip.journal_id.id,
-                'date': slip.date or slip.date_to,
             }
-            for line in slip.details_by_salary_rule_category_ids:
-                amount = slip.company_id.currency_id.round(
-                    slip.credit_note and -line.total or line.total)
-                if slip.company_id.currency_id.is_zero(amount):
-                    continue
-                debit_account_id = line.salary_rule_id.account_debit_id.id
-                credit_account_id = line.salary_rule_id.account_credit_id.id
-                if debit_account_id:
-                    debit_line = (0, 0, {
-                        'name': line.name,
-                        'partner_id': line._get_partner_id(
-                            credit_account=False),
-                        'account_id': debit_account_id,
-                        'journal_id': slip.journal_id.id,
-                        'date': slip.date or slip.date_to,
-                        'debit': amount > 0.0 and amount or 0.0,
-                        'credit': amount < 0.0 and -amount or 0.0,
-                        'tax_line_id': line.salary_rule_id.account_tax_id.id,
-                    })
-                    line_ids.append(debit_line)
-                    debit_sum += debit_line[2]['debit'] - debit_line[2][
-                        'credit']
-                if credit_account_id:
-                    credit_line = (0, 0, {
-                        'name': line.name,
-                        'partner_id': line._get_partner_id(credit_account=True),
-                        'account_id': credit_account_id,
-                        'journal_id': slip.journal_id.id,
-                        'date': slip.date or slip.date_to,
-                        'debit': amount < 0.0 and -amount or 0.0,
-                        'credit': amount > 0.0 and amount or 0.0,
-                        'tax_line_id': line.salary_rule_id.account_tax_id.id,
-                    })
-                    line_ids.append(credit_line)
-                    credit_sum += credit_line[2]['credit'] - credit_line[2][
-                        'debit']
-            if slip.company_id.currency_id.compare_amounts(
-                    credit_sum, debit_sum) == -1:
-                acc_id = slip.journal_id.default_account_id.id
-                if not acc_id:
-                    raise UserError(
-                        _('The Expense Journal "%s" has not properly '
-                          'configured the Credit Account!') % (
-                            slip.journal_id.name))
-                adjust_credit = (0, 0, {
-                    'name': _('Adjustment Entry'),
-                    'partner_id': False,
-                    'account_id': acc_id,
-                    'journal_id': slip.journal_id.id,
-                    'date': slip.date or slip.date_to,
-                    'debit': 0.0,
-                    'credit':  slip.company_id.currency_id.round(
-                        debit_sum - credit_sum),
+        else:
+            line_vals = self._group_move_line_values(line_vals, per_partner)
+            name = ', '.join(self.mapped('payslip_run_id.name')) or _(
+                'Payslips')
+            move_dict = {
+                'narration': _('Payslips of %s') % name,
+                'ref': name,
+            }
+        adjustment = self._prepare_adjustment_line_values(journal, date,
+                                                          line_vals)
+        if adjustment:
+            line_vals.append(adjustment)
+        move_dict.update({
+            'journal_id': journal.id,
+            'date': date,
+            'line_ids': [(0, 0, vals) for vals in line_vals],
+        })
+        return move_dict
+
+    def _prepare_move_line_values(self):
+        """Prepare the debit and credit journal items of the payslip, from
+        the accounts of its salary rules"""
+        self.ensure_one()
+        line_ids = []
+        date = self.date or self.date_to
+        currency = self.company_id.currency_id
+        for line in self.details_by_salary_rule_category_ids:
+            amount = currency.round(
+                self.credit_note and -line.total or line.total)
+            if currency.is_zero(amount):
+                continue
+            debit_account_id = line.salary_rule_id.account_debit_id.id
+            credit_account_id = line.salary_rule_id.account_credit_id.id
+            if debit_account_id:
+                line_ids.append({
+                    'name': line.name,
+                    'partner_id': line._get_partner_id(credit_account=False),
+                    'account_id': debit_account_id,
+                    'journal_id': self.journal_id.id,
+                    'date': date,
+                    'debit': amount > 0.0 and amount or 0.0,
+                    'credit': amount < 0.0 and -amount or 0.0,
+                    'tax_line_id': line.salary_rule_id.account_tax_id.id,
                 })
-                line_ids.append(adjust_credit)
-            elif slip.company_id.currency_id.compare_amounts(
-                    debit_sum, credit_sum) == -1:
-                acc_id = slip.journal_id.default_account_id.id
-                if not acc_id:
-                    raise UserError(
-                        _('The Expense Journal "%s" has not properly '
-                          'configured the Debit Account!') % (
-                            slip.journal_id.name))
-                adjust_debit = (0, 0, {
-                    'name': _('Adjustment Entry'),
-                    'partner_id': False,
-                    'account_id': acc_id,
-                    'journal_id': slip.journal_id.id,
-                    'date': slip.date or slip.date_to,
-                    'debit':  slip.company_id.currency_id.round(
-                        credit_sum - debit_sum),
-                    'credit': 0.0,
+            if credit_account_id:
+                line_ids.append({
+                    'name': line.name,
+                    'partner_id': line._get_partner_id(credit_account=True),
+                    'account_id': credit_account_id,
+                    'journal_id': self.journal_id.id,
+                    'date': date,
+                    'debit': amount < 0.0 and -amount or 0.0,
+                    'credit': amount > 0.0 and amount or 0.0,
+                    'tax_line_id': line.salary_rule_id.account_tax_id.id,
                 })
-                line_ids.append(adjust_debit)
-            move_dict['line_ids'] = line_ids
-            move = self.env['account.move'].create(move_dict)
-            slip.write({'move_id': move.id, 'date': slip.date or slip.date_to})
-            if not move.line_ids:
-                raise UserError(
-                    _("As you installed the payroll accounting module you have"
-                      " to choose Debit and Credit account for at least one "
-                      "salary rule in the chosen Salary Structure."))
-            move.action_post()
+        return line_ids
+
+    def _group_move_line_values(self, line_vals, per_partner):
+        """Sum the journal items of several payslips per salary rule,
+        account and tax, and per partner if per_partner is set"""
+        currency = self[:1].company_id.currency_id
+        grouped = {}
+        for vals in line_vals:
+            partner_id = per_partner and vals['partner_id'] or False
+            key = (vals['name'], vals['account_id'], partner_id,
+                   vals['tax_line_id'])
+            if key not in grouped:
+                grouped[key] = dict(vals, partner_id=partner_id, balance=0.0)
+            grouped[key]['balance'] += vals['debit'] - vals['credit']
+        res = []
+        for vals in grouped.values():
+            balance = currency.round(vals.pop('balance'))
+            if currency.is_zero(balance):
+                continue
+            vals.update({
+                'debit': balance > 0.0 and balance or 0.0,
+                'credit': balance < 0.0 and -balance or 0.0,
+            })
+            res.append(vals)
         return res
+
+    def _prepare_adjustment_line_values(self, journal, date, line_vals):
+        """Prepare the journal item balancing the debit and credit amounts
+        of the journal items, if needed"""
+        currency = self[:1].company_id.currency_id
+        debit_sum = sum(vals['debit'] for vals in line_vals)
+        credit_sum = sum(vals['credit'] for vals in line_vals)
+        if currency.compare_amounts(credit_sum, debit_sum) == -1:
+            acc_id = journal.default_account_id.id
+            if not acc_id:
+                raise UserError(
+                    _('The Expense Journal "%s" has not properly '
+                      'configured the Credit Account!') % (journal.name))
+            return {
+                'name': _('Adjustment Entry'),
+                'partner_id': False,
+                'account_id': acc_id,
+                'journal_id': journal.id,
+                'date': date,
+                'debit': 0.0,
+                'credit': currency.round(debit_sum - credit_sum),
+            }
+        elif currency.compare_amounts(debit_sum, credit_sum) == -1:
+            acc_id = journal.default_account_id.id
+            if not acc_id:
+                raise UserError(
+                    _('The Expense Journal "%s" has not properly '
+                      'configured the Debit Account!') % (journal.name))
+            return {
+                'name': _('Adjustment Entry'),
+                'partner_id': False,
+                'account_id': acc_id,
+                'journal_id': journal.id,
+                'date': date,
+                'debit': currency.round(credit_sum - debit_sum),
+                'credit': 0.0,
+            }
+        return False
@@ -38,3 +38,24 @@ class HrPayslipRun(models.Model):
                                      'account.journal'].search(
                                      [('type', '=', 'general')],
                                      limit=1))
+    move_grouping = fields.Selection([
+        ('slip', 'One Entry per Payslip'),
+        ('journal_date', 'One Entry per Journal and Date'),
+        ('journal_date_partner', 'One Entry per Journal and Date, '
+                                 'by Partner'),
+    ], string='Accounting Entries', required=True, default='slip',
+        help="Grouping of the journal entries posted when validating the "
+             "payslips of the batch")
+
+    def _generate_payslips(self, employees):
+        """Generate the payslips of the batch in its salary journal."""
+        return super(HrPayslipRun, self.with_context(
+            journal_id=self.journal_id.id))._generate_payslips(employees)
+
+    def action_validate_payslips(self):
+        """Validate the payslips of the batch, grouping their journal
+        entries as configured on the batch."""
+        for record in self:
+            super(HrPayslipRun, record.with_context(
+                payslip_move_grouping=record.move_grouping
+            )).action_validate_payslips()
@@ -37,6 +37,7 @@
         'security/ir.model.access.csv',
         'data/hr_payroll_sequence.xml',
         'data/hr_payroll_data.xml',
+        'data/ir_cron_data.xml',
         'wizard/hr_payslips_employees_views.xml',
         'wizard/payslip_lines_contribution_register_views.xml',
         'report/hr_payroll_report.xml',
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from odoo import api, http
+from odoo.http import content_disposition, request
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv;charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.'
+            'spreadsheetml.sheet',
+}
+
+
+class ContributionRegisterExport(http.Controller):
+    """Controller for streaming the payslip lines of the Contribution
+    Registers as CSV or XLSX files"""
+
+    @http.route('/hr_payroll_community/contribution_register/export',
+                type='http', auth='user')
+    def export_contribution_register(self, register_ids, date_from, date_to,
+                                     output_format='csv'):
+        """Function for exporting the payslip lines of the Contribution
+        Registers between two dates. The rows are written while they are
+        fetched from a server-side cursor, in a cursor of their own since
+        the response is streamed after the request is finished."""
+        if output_format not in EXPORT_FORMATS:
+            return request.not_found()
+        register_ids = [int(register_id) for register_id in
+                        register_ids.split(',') if register_id]
+        registers = request.env['hr.contribution.register'].browse(
+            register_ids)
+        registers.check_access_rights('read')
+        registers.check_access_rule('read')
+        request.env['hr.payslip.line'].check_access_rights('read')
+        registry = request.env.registry
+        uid = request.env.uid
+        context = dict(request.env.context)
+
+        def stream():
+            """Function for writing the rows of the export"""
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                report = env[
+                    'report.hr_payroll_community.report_contributionregister']
+                yield from getattr(report, '_export_%s' % output_format)(
+                    register_ids, date_from, date_to)
+
+        filename = 'contribution_register_%s_%s.%s' % (
+            date_from, date_to, output_format)
+        return request.make_response(stream(), headers=[
+            ('Content-Type', EXPORT_FORMATS[output_format]),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
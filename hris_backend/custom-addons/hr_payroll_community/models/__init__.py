@@ -25,14 +25,22 @@ from . import hr_contract_advantage_template
 from . import hr_contribution_register
 from . import hr_employee
 from . import hr_leave_type
+from . import hr_payroll_benchmark
+from . import hr_payroll_simulation
 from . import hr_payroll_structure
 from . import hr_payslip
+from . import hr_payslip_archive
 from . import hr_payslip_input
 from . import hr_salary_rule
 from . import hr_payslip_line
+from . import hr_payslip_ledger
 from . import hr_payslip_run
+from . import hr_payslip_run_rule_stat
+from . import hr_payslip_run_shard
 from . import hr_payslip_worked_days
 from . import hr_rule_input
 from . import hr_salary_rule_category
+from . import hr_salary_rule_category_closure
+from . import hr_salary_rule_version
 from . import res_config_settings
 from . import resource_mixin
@@ -21,6 +21,7 @@
 #
 #############################################################################
 from odoo import fields, models
+from odoo.tools import create_index
 
 
 class HrContract(models.Model):
@@ -59,6 +60,13 @@ class HrContract(models.Model):
     other_allowance = fields.Monetary(string="Other Allowance",
                                       help="Other allowances")
 
+    def init(self):
+        """Function for indexing the contracts on the columns searched by
+        the payslips to find the current contracts of the employees"""
+        create_index(self._cr, 'hr_contract_employee_state_dates_index',
+                     self._table,
+                     ['employee_id', 'state', 'date_start', 'date_end'])
+
     def get_all_structures(self):
         """
         @return: the structures linked to the given contracts, ordered by
@@ -69,7 +77,10 @@ class HrContract(models.Model):
         if not structures:
             return []
         # YTI TODO return browse records
-        return list(set(structures._get_parent_structure().ids))
+        structure_ids = set()
+        for structure in structures:
+            structure_ids.update(structure._get_parent_structure_ids())
+        return list(structure_ids)
 
     def get_attribute(self, code, attribute):
         """Function for return code for Contract"""
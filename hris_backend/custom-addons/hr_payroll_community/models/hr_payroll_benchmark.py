@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class PayrollBenchmarkRollback(Exception):
+    """Raised to roll back the synthetic data of a benchmark"""
+
+
+class HrPayrollBenchmark(models.AbstractModel):
+    """Benchmark of the payslip batches on synthetic data. It is run from an
+    odoo shell before a deployment, for instance:
+
+        env['hr.payroll.benchmark'].run_benchmark(
+            employee_count=1000, rule_count=10, report_path='/tmp/payroll.json')
+
+    and reports the duration, the number of SQL queries and the peak memory
+    of every stage of the batch."""
+    _name = 'hr.payroll.benchmark'
+    _description = 'Payroll Benchmark'
+
+    @api.model
+    def run_benchmark(self, employee_count=100, rule_count=5, leave_count=2,
+                      report_path=None, rollback=True):
+        """
+        @param employee_count: number of employees (and contracts) generated
+        @param rule_count: number of salary rules generated per amount type
+        @param leave_count: number of leave days generated per employee
+        @param report_path: file the JSON report is written to, if any
+        @param rollback: whether the synthetic data is rolled back afterwards
+        @return: the report, as a dict
+        """
+        report = {
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'database': self.env.cr.dbname,
+            'parameters': {
+                'employee_count': employee_count,
+                'rule_count': rule_count,
+                'leave_count': leave_count,
+            },
+            'stages': [],
+        }
+        try:
+            with self.env.cr.savepoint():
+                self._run_stages(report, employee_count, rule_count,
+                                 leave_count)
+                if rollback:
+                    raise PayrollBenchmarkRollback()
+        except PayrollBenchmarkRollback:
+            self.env.invalidate_all()
+        report['total_duration'] = sum(
+            stage['duration'] for stage in report['stages'])
+        if report_path:
+            with open(report_path, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+        _logger.info("Payroll benchmark: %s", json.dumps(report))
+        return report
+
+    @contextmanager
+    def _measure(self, report, stage, count):
+        """Measure the duration, the SQL queries and the peak memory of the
+        code run in the context, and add them to the report"""
+        self.env.flush_all()
+        queries = self.env.cr.sql_log_count
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+            self.env.flush_all()
+            duration = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        report['stages'].append({
+            'name': stage,
+            'count': count,
+            'duration': duration,
+            'queries': self.env.cr.sql_log_count - queries,
+            'peak_memory': peak,
+        })
+
+    def _run_stages(self, report, employee_count, rule_count, leave_count):
+        """Generate the synthetic data and measure the stages of a batch"""
+        payslip_obj = self.env['hr.payslip']
+        date_from = fields.Date.today().replace(day=1)
+        date_to = date_from + relativedelta(months=1, days=-1)
+        with self._measure(report, 'data_generation', employee_count):
+            structure = self._generate_structure(rule_count)
+            employees = self._generate_employees(employee_count, structure,
+                                                 date_from, leave_count)
+            payslip_run = self.env['hr.payslip.run'].create({
+                'name': 'Payroll Benchmark',
+                'date_start': date_from,
+                'date_end': date_to,
+            })
+        with self._measure(report, 'onchange', min(employee_count, 10)):
+            for employee in employees[:10]:
+                payslip_obj.onchange_employee_id(date_from, date_to,
+                                                 employee.id)
+        with self._measure(report, 'contracts', employee_count):
+            contracts_by_employee = payslip_obj._get_contracts_by_employee(
+                employees, date_from, date_to)
+        contracts = self.env['hr.contract'].concat(
+            *contracts_by_employee.values())
+        with self._measure(report, 'worked_days', len(contracts)):
+            payslip_obj._get_worked_day_lines_batch(contracts, date_from,
+                                                    date_to)
+        with self._measure(report, 'inputs', employee_count):
+            for employee_contracts in contracts_by_employee.values():
+                payslip_obj.get_inputs(employee_contracts, date_from, date_to)
+        with self._measure(report, 'payslip_creation', employee_count):
+            payslips = payslip_obj.create(
+                payslip_obj._prepare_payslip_run_values(payslip_run,
+                                                        employees))
+        lines_by_slip = {}
+        with self._measure(report, 'rule_evaluation', len(payslips)):
+            for payslip in payslips:
+                lines_by_slip[payslip.id] = payslip._get_payslip_lines(
+                    payslip.contract_id.ids, payslip.id)
+        lines = []
+        for payslip_id, slip_lines in lines_by_slip.items():
+            for line in slip_lines:
+                line['slip_id'] = payslip_id
+                lines.append(line)
+        with self._measure(report, 'line_write', len(lines)):
+            self.env['hr.payslip.line'].create(lines)
+        with self._measure(report, 'compute_sheet', len(payslips)):
+            payslips.action_compute_sheet()
+        # posts the journal entries when the accounting is installed
+        with self._measure(report, 'validation', len(payslips)):
+            payslips.action_payslip_done()
+
+    def _generate_structure(self, rule_count):
+        """Generate a salary structure with rule_count rules of every amount
+        type, the python ones using an input"""
+        category = self.env['hr.salary.rule.category'].create({
+            'name': 'Benchmark',
+            'code': 'BENCH',
+        })
+        rules_vals = []
+        for index in range(rule_count):
+            rules_vals += [{
+                'name': 'Benchmark Fixed %s' % index,
+                'code': 'BENCH_FIX_%s' % index,
+                'sequence': 10 + index,
+                'category_id': category.id,
+                'amount_select': 'fix',
+                'amount_fix': 100.0 + index,
+            }, {
+                'name': 'Benchmark Percentage %s' % index,
+                'code': 'BENCH_PCT_%s' % index,
+                'sequence': 10 + index,
+                'category_id': category.id,
+                'amount_select': 'percentage',
+                'amount_percentage_base': 'contract.wage',
+                'amount_percentage': 1.0 + index,
+            }, {
+                'name': 'Benchmark Python %s' % index,
+                'code': 'BENCH_PY_%s' % index,
+                'sequence': 10 + index,
+                'category_id': category.id,
+                'condition_select': 'python',
+                'condition_python': 'result = contract.wage > 0',
+                'amount_select': 'code',
+                'amount_python_compute':
+                    'result = contract.wage * 0.01 + '
+                    'inputs.BENCH_IN.amount' if index == 0 else
+                    'result = categories.BENCH * 0.001',
+                'input_ids': [(0, 0, {'name': 'Benchmark Input',
+                                      'code': 'BENCH_IN'})] if index == 0
+                else [],
+            }]
+        rules = self.env['hr.salary.rule'].create(rules_vals)
+        return self.env['hr.payroll.structure'].create({
+            'name': 'Payroll Benchmark',
+            'code': 'BENCH',
+            'rule_ids': [(6, 0, rules.ids)],
+        })
+
+    def _generate_employees(self, employee_count, structure, date_from,
+                            leave_count):
+        """Generate employees with a working schedule, an open contract on
+        the structure and leave_count leave days in the month"""
+        calendar = self.env['resource.calendar'].create({
+            'name': 'Payroll Benchmark',
+        })
+        employees = self.env['hr.employee'].create([{
+            'name': 'Benchmark Employee %05d' % index,
+            'resource_calendar_id': calendar.id,
+        } for index in range(employee_count)])
+        self.env['hr.contract'].create([{
+            'name': 'Benchmark Contract %05d' % index,
+            'employee_id': employee.id,
+            'struct_id': structure.id,
+            'resource_calendar_id': calendar.id,
+            'wage': 1000.0 + index,
+            'date_start': date_from - relativedelta(years=1),
+            'state': 'open',
+        } for index, employee in enumerate(employees)])
+        leaves_vals = []
+        for employee in employees:
+            for day in range(leave_count):
+                leave_date = datetime.combine(
+                    date_from + timedelta(days=2 * day + 1),
+                    datetime.min.time())
+                leaves_vals.append({
+                    'name': 'Benchmark Leave',
+                    'calendar_id': calendar.id,
+                    'resource_id': employee.resource_id.id,
+                    'date_from': leave_date + timedelta(hours=8),
+                    'date_to': leave_date + timedelta(hours=17),
+                })
+        self.env['resource.calendar.leaves'].create(leaves_vals)
+        return employees
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+import re
+from collections import defaultdict
+
+from odoo import api, models
+from .hr_payslip import BrowsableObject, InputLine, Payslips, WorkedDays
+from .hr_payslip_ledger import PayslipLedger
+
+_logger = logging.getLogger(__name__)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    _logger.debug('Cannot `import numpy`, the payroll simulation evaluates '
+                  'every rule employee by employee.')
+
+# Expressions evaluated for all the employees at once: a number, a field of
+# the contract, a category or the code of a previous rule
+VECTOR_EXPRESSION = re.compile(
+    r'^\s*(?:(?P<number>\d+(?:\.\d*)?)|contract\.(?P<field>\w+)|'
+    r'categories\.(?P<category>\w+)|(?P<code>[A-Za-z_]\w*))\s*$')
+NUMERIC_FIELD_TYPES = ('float', 'integer', 'monetary')
+
+
+class SimulatedContract(object):
+    """Contract seen by the salary rules of a simulation, some of its values
+    being replaced by the simulated ones"""
+
+    def __init__(self, contract, values):
+        """Function for getting the contract and its simulated values"""
+        self._contract = contract
+        self._values = values
+
+    def __getattr__(self, attr):
+        """Function for returning the simulated value, or else the value of
+        the contract"""
+        if attr in self._values:
+            return self._values[attr]
+        return getattr(self._contract, attr)
+
+
+class HrPayrollSimulation(models.AbstractModel):
+    """What-if simulation of the payroll of many employees, computing the
+    totals of the salary rules and categories without creating any payslip.
+    For instance, a 5% wage rise:
+
+        env['hr.payroll.simulation'].simulate(
+            '2024-01-01', '2024-01-31', wage_factor=1.05)
+
+    The fixed and percentage rules based on a number, a contract field, a
+    category or a previous rule are evaluated for all the employees at once
+    as numpy array operations; the other rules, and all of them when numpy
+    is not installed, are evaluated employee by employee."""
+    _name = 'hr.payroll.simulation'
+    _description = 'Payroll Simulation'
+
+    @api.model
+    def simulate(self, date_from, date_to, employees=None, wage_factor=1.0,
+                 rule_overrides=None):
+        """
+        @param date_from: start date of the simulated period
+        @param date_to: end date of the simulated period
+        @param employees: recordset of employees, all of them by default
+        @param wage_factor: factor applied to the wage of the contracts
+        @param rule_overrides: dict {rule code: {field: value}} replacing the
+        amount_fix or amount_percentage of salary rules
+        @return: a dict with the totals of the rules and of the categories,
+        by code, and the number of simulated employees
+        """
+        if employees is None:
+            employees = self.env['hr.employee'].search([])
+        payslip_obj = self.env['hr.payslip']
+        contracts_by_employee = payslip_obj._get_contracts_by_employee(
+            employees, date_from, date_to)
+        # as for the payslips of a batch, the rules are the ones of the
+        # structure of the first contract of each employee
+        contracts = self.env['hr.contract'].concat(*(
+            contracts[:1] for contracts in contracts_by_employee.values()
+            if contracts[:1].struct_id))
+        worked_days = payslip_obj._get_worked_day_lines_batch(
+            contracts, date_from, date_to)
+        ledger = PayslipLedger(self.env, contracts.mapped('employee_id').ids)
+        contracts_by_structures = defaultdict(lambda: self.env['hr.contract'])
+        for contract in contracts:
+            contracts_by_structures[
+                contract.struct_id._get_parent_structure_ids()] |= contract
+        result = {
+            'employee_count': len(contracts),
+            'rules': defaultdict(float),
+            'categories': defaultdict(float),
+        }
+        for structure_ids, group in contracts_by_structures.items():
+            rule_plan = self.env[
+                'hr.payroll.structure']._get_compiled_rule_plan(structure_ids)
+            state = self._simulate_group(
+                group, rule_plan, date_from, date_to, worked_days, ledger,
+                wage_factor, rule_overrides or {})
+            for code, values in state['values'].items():
+                result['rules'][code] += float(sum(values))
+            for code, values in state['categories'].items():
+                result['categories'][code] += float(sum(values))
+        result['rules'] = dict(result['rules'])
+        result['categories'] = dict(result['categories'])
+        return result
+
+    def _simulate_group(self, contracts, rule_plan, date_from, date_to,
+                        worked_days, ledger, wage_factor, rule_overrides):
+        """Function for computing the rules of a structure for all the given
+        contracts, one row per contract. The rules are computed level by
+        level of the rule plan, each level only depending on the previous
+        ones."""
+        count = len(contracts)
+        state = {
+            'contracts': contracts,
+            'count': count,
+            'values': {},
+            'applied': {},
+            'categories': {},
+            'blocked': {},
+            'rules': {},
+            'fields': {},
+            'localdicts': [],
+            'always_true': rule_plan.always_true,
+        }
+        payslip_obj = self.env['hr.payslip']
+        inputs_by_contract = defaultdict(list)
+        for input_line in payslip_obj.get_inputs(contracts, date_from,
+                                                 date_to):
+            inputs_by_contract[input_line['contract_id']].append(input_line)
+        for contract in contracts:
+            employee_id = contract.employee_id.id
+            simulated_contract = SimulatedContract(
+                contract, {'wage': contract.wage * wage_factor})
+            state['localdicts'].append({
+                'employee': contract.employee_id,
+                'contract': simulated_contract,
+                'payslip': Payslips(employee_id, {
+                    'employee_id': contract.employee_id,
+                    'contract_id': simulated_contract,
+                    'struct_id': contract.struct_id,
+                    'company_id': contract.employee_id.company_id,
+                    'date_from': date_from,
+                    'date_to': date_to,
+                    'credit_note': False,
+                }, self.env, ledger),
+                'worked_days': WorkedDays(employee_id, {
+                    line['code']: BrowsableObject(employee_id, line, self.env)
+                    for line in worked_days.get(contract.id, [])
+                }, self.env, ledger),
+                'inputs': InputLine(employee_id, {
+                    line['code']: BrowsableObject(employee_id, line, self.env)
+                    for line in inputs_by_contract[contract.id]
+                }, self.env, ledger),
+            })
+        rules = self.env['hr.salary.rule'].browse(
+            [rule_id for level in rule_plan.levels for rule_id in level])
+        for rule in rules:
+            overrides = rule_overrides.get(rule.code, {})
+            computed = numpy is not None and self._simulate_rule_vector(
+                rule, overrides, state, wage_factor)
+            if not computed:
+                computed = self._simulate_rule_rows(rule, overrides, state)
+            self._apply_rule(rule, state, *computed)
+        return state
+
+    def _get_vector(self, expression, state, wage_factor):
+        """Function for getting the values of a simple expression for all
+        the rows, None when it cannot be evaluated as an array"""
+        match = VECTOR_EXPRESSION.match(expression or '')
+        if not match:
+            return None
+        count = state['count']
+        if match.group('number'):
+            return numpy.full(count, float(match.group('number')))
+        if match.group('field'):
+            fname = match.group('field')
+            field = state['contracts']._fields.get(fname)
+            if not field or field.type not in NUMERIC_FIELD_TYPES:
+                return None
+            if fname not in state['fields']:
+                values = numpy.array(state['contracts'].mapped(fname),
+                                     dtype=float)
+                if fname == 'wage':
+                    values = values * wage_factor
+                state['fields'][fname] = values
+            return state['fields'][fname]
+        if match.group('category'):
+            return state['categories'].get(match.group('category'),
+                                           numpy.zeros(count))
+        return state['values'].get(match.group('code'))
+
+    def _simulate_rule_vector(self, rule, overrides, state, wage_factor):
+        """
+        @return: the (applies, amount, quantity, rate) arrays of the rule for
+        all the rows, or None when the rule has to be evaluated row by row
+        """
+        count = state['count']
+        if rule.id in state['always_true']:
+            applies = numpy.ones(count, dtype=bool)
+        elif rule.condition_select == 'range':
+            values = self._get_vector(rule.condition_range, state,
+                                      wage_factor)
+            if values is None:
+                return None
+            applies = (rule.condition_range_min <= values) & (
+                values <= rule.condition_range_max)
+        else:
+            return None
+        quantity = self._get_vector(rule.quantity, state, wage_factor)
+        if quantity is None:
+            return None
+        if rule.amount_select == 'fix':
+            amount = numpy.full(count, overrides.get('amount_fix',
+                                                     rule.amount_fix))
+            rate = numpy.full(count, 100.0)
+        elif rule.amount_select == 'percentage':
+            amount = self._get_vector(rule.amount_percentage_base, state,
+                                      wage_factor)
+            if amount is None:
+                return None
+            rate = numpy.full(count, overrides.get('amount_percentage',
+                                                   rule.amount_percentage))
+        else:
+            return None
+        blocked = state['blocked'].get(rule.id)
+        if blocked is not None:
+            applies = applies & ~blocked
+        return applies, amount, quantity, rate
+
+    def _simulate_rule_rows(self, rule, overrides, state):
+        """
+        @return: the (applies, amount, quantity, rate) lists of the rule,
+        evaluated row by row in the localdict of each row
+        """
+        applies, amounts, quantities, rates = [], [], [], []
+        blocked = state['blocked'].get(rule.id)
+        for index in range(state['count']):
+            localdict = self._get_row_localdict(state, index)
+            if (blocked is not None and blocked[index]) or \
+                    not rule._satisfy_condition(localdict):
+                applies.append(False)
+                amounts.append(0.0)
+                quantities.append(0.0)
+                rates.append(0.0)
+                continue
+            amount, quantity, rate = rule._compute_rule(localdict)
+            if rule.amount_select == 'fix':
+                amount = overrides.get('amount_fix', amount)
+            elif rule.amount_select == 'percentage':
+                rate = overrides.get('amount_percentage', rate)
+            applies.append(True)
+            amounts.append(amount)
+            quantities.append(float(quantity))
+            rates.append(rate)
+        if numpy is not None:
+            return (numpy.array(applies, dtype=bool), numpy.array(amounts),
+                    numpy.array(quantities), numpy.array(rates))
+        return applies, amounts, quantities, rates
+
+    def _get_row_localdict(self, state, index):
+        """Function for building the localdict of a row from the values
+        computed so far"""
+        localdict = state['localdicts'][index]
+        employee_id = localdict['employee'].id
+        localdict = dict(localdict, result=None, result_qty=1.0,
+                         result_rate=100)
+        localdict['categories'] = BrowsableObject(employee_id, {
+            code: float(values[index])
+            for code, values in state['categories'].items()}, self.env)
+        codes = [code for code, applied in state['applied'].items()
+                 if applied[index]]
+        localdict['rules'] = BrowsableObject(employee_id, {
+            code: state['rules'][code] for code in codes}, self.env)
+        for code in codes:
+            localdict[code] = float(state['values'][code][index])
+        return localdict
+
+    def _apply_rule(self, rule, state, applies, amount, quantity, rate):
+        """Function for storing the totals of a rule on the rows it applies
+        to, summing them in its categories and blacklisting its children on
+        the other rows"""
+        count = state['count']
+        code = rule.code
+        if numpy is not None:
+            applies = numpy.asarray(applies, dtype=bool)
+            total = numpy.asarray(amount) * numpy.asarray(
+                quantity) * numpy.asarray(rate) / 100.0
+            previous = state['values'].get(code, numpy.zeros(count))
+            state['values'][code] = numpy.where(applies, total, previous)
+            delta = numpy.where(applies, total - previous, 0.0)
+            state['applied'][code] = state['applied'].get(
+                code, numpy.zeros(count, dtype=bool)) | applies
+            category = rule.category_id
+            while category:
+                state['categories'][category.code] = state['categories'].get(
+                    category.code, numpy.zeros(count)) + delta
+                category = category.parent_id
+            if not applies.all():
+                for rule_id in rule._get_recursive_rule_ids():
+                    blocked = state['blocked'].get(rule_id)
+                    state['blocked'][rule_id] = ~applies if blocked is None \
+                        else blocked | ~applies
+        else:
+            previous = state['values'].get(code, [0.0] * count)
+            values = list(previous)
+            applied = list(state['applied'].get(code, [False] * count))
+            delta = [0.0] * count
+            for index in range(count):
+                if applies[index]:
+                    total = amount[index] * quantity[index] * rate[
+                        index] / 100.0
+                    values[index] = total
+                    delta[index] = total - previous[index]
+                    applied[index] = True
+            state['values'][code] = values
+            state['applied'][code] = applied
+            category = rule.category_id
+            while category:
+                current = state['categories'].get(category.code,
+                                                  [0.0] * count)
+                state['categories'][category.code] = [
+                    value + delta[index]
+                    for index, value in enumerate(current)]
+                category = category.parent_id
+            if not all(applies):
+                for rule_id in rule._get_recursive_rule_ids():
+                    blocked = state['blocked'].get(rule_id, [False] * count)
+                    state['blocked'][rule_id] = [
+                        blocked[index] or not applies[index]
+                        for index in range(count)]
+        state['rules'][code] = rule
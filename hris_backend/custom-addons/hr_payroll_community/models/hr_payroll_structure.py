@@ -20,8 +20,9 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError
+from .hr_salary_rule_plan import compile_rule_plan
 
 
 class HrPayrollStructure(models.Model):
@@ -70,6 +71,25 @@ class HrPayrollStructure(models.Model):
             raise ValidationError(
                 _('You cannot create a recursive salary structure.'))
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Function to clear the cached rule plans on creation"""
+        res = super(HrPayrollStructure, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        """Function to clear the cached rule plans on edition"""
+        res = super(HrPayrollStructure, self).write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        """Function to clear the cached rule plans on deletion"""
+        res = super(HrPayrollStructure, self).unlink()
+        self.env.registry.clear_cache()
+        return res
+
     @api.returns('self', lambda value: value.id)
     def copy(self, default=None):
         """Function for return Payroll Structure"""
@@ -93,3 +113,36 @@ class HrPayrollStructure(models.Model):
         if parent:
             parent = parent._get_parent_structure()
         return parent + self
+
+    @tools.ormcache('self.id')
+    def _get_parent_structure_ids(self):
+        """
+        @return: the ids of the structure and of all its parents, without
+        duplicate, cached until the structures change
+        """
+        return tuple(sorted(set(self._get_parent_structure().ids)))
+
+    @api.model
+    @tools.ormcache('tuple(sorted(structure_ids))')
+    def _get_rule_plan(self, structure_ids):
+        """
+        @param structure_ids: ids of the structures to apply
+        @return: a tuple with the ids of the rules of the structures and of
+        their children, ordered by sequence. It is resolved once per set of
+        structures and cached until a structure or a rule changes.
+        """
+        rule_ids = self.browse(sorted(structure_ids)).get_all_rules()
+        return tuple(id for id, sequence in
+                     sorted(rule_ids, key=lambda x: x[1]))
+
+    @api.model
+    @tools.ormcache('tuple(sorted(structure_ids))')
+    def _get_compiled_rule_plan(self, structure_ids):
+        """
+        @param structure_ids: ids of the structures to apply
+        @return: the RulePlan of the rules of the structures, analysed once
+        per set of structures and cached until a structure, a rule or a
+        category changes
+        """
+        return compile_rule_plan(self.env['hr.salary.rule'].browse(
+            self._get_rule_plan(structure_ids)))
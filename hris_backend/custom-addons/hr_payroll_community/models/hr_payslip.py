@@ -20,17 +20,91 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from datetime import date, datetime, time
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 import babel
 from dateutil.relativedelta import relativedelta
 from pytz import timezone
 from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+from .hr_payslip_ledger import PayslipLedger
+from .hr_payslip_run_rule_stat import RuleProfiler
+from .resource_mixin import hours_per_day
 
 # This will generate 16th of days
 ROUNDING_FACTOR = 16
 
 
+class BrowsableObject(object):
+    """Class for Browsable Object"""
+
+    def __init__(self, employee_id, dict, env, ledger=None):
+        """Function for getting employee_id,dict, env and the ledger of the
+        payslip history"""
+        self.employee_id = employee_id
+        self.dict = dict
+        self.env = env
+        self._ledger = ledger
+
+    def __getattr__(self, attr):
+        """Function for return dict"""
+        return attr in self.dict and self.dict.__getitem__(attr) or 0.0
+
+    def _ledger_sum(self, kind, code, from_date, to_date=None):
+        """Function for getting the totals of the done payslips of the
+        employee from the ledger of the payslip history"""
+        if to_date is None:
+            to_date = fields.Date.today()
+        if self._ledger is None:
+            self._ledger = PayslipLedger(self.env, [self.employee_id])
+        return self._ledger.sum(self.employee_id, kind, code, from_date,
+                                to_date)
+
+
+class InputLine(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        return self._ledger_sum('input', code, from_date, to_date)[0] or 0.0
+
+
+class WorkedDays(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def _sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip days with respect to
+         from_date,to_date fields"""
+        return self._ledger_sum('worked_days', code, from_date, to_date)[1:]
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        res = self._sum(code, from_date, to_date)
+        return res and res[0] or 0.0
+
+    def sum_hours(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip hours with respect to
+         from_date,to_date fields"""
+        res = self._sum(code, from_date, to_date)
+        return res and res[1] or 0.0
+
+
+class Payslips(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        return self._ledger_sum('line', code, from_date, to_date)[0] or 0.0
+
+
 class HrPayslip(models.Model):
     """Create new model for getting total Payroll Sheet for an Employee"""
     _name = 'hr.payslip'
@@ -111,6 +185,19 @@ class HrPayslip(models.Model):
     payslip_count = fields.Integer(compute='_compute_payslip_count',
                                    string="Payslip Computation Details",
                                    help="Set Payslip Count")
+    compute_fingerprint = fields.Char(string='Computation Fingerprint',
+                                      readonly=True, copy=False,
+                                      help="Hash of the data the lines of the "
+                                           "payslip were computed from")
+    pdf_attachment_id = fields.Many2one('ir.attachment', string='Payslip PDF',
+                                        readonly=True, copy=False,
+                                        help="PDF of the payslip rendered "
+                                             "with its payslip batch")
+    archived = fields.Boolean(string='Archived Lines', readonly=True,
+                              copy=False, index=True,
+                              help="The lines, worked days and inputs of the "
+                                   "payslip were moved to the archive "
+                                   "tables")
 
     def _compute_details_by_salary_rule_category_ids(self):
         """Compute function for Salary Rule Category for getting
@@ -170,6 +257,21 @@ class HrPayslip(models.Model):
             'context': {}
         }
 
+    def write(self, vals):
+        """Function for keeping the ledger of the payslip history up to
+        date with the done payslips"""
+        if 'state' in vals and any(self.mapped('archived')):
+            raise UserError(_('You cannot change the status of an archived '
+                              'payslip, restore its lines first.'))
+        res = super(HrPayslip, self).write(vals)
+        if 'state' in vals:
+            self.env['hr.payslip.ledger']._record_slips(self)
+        return res
+
+    def action_restore_archive(self):
+        """Function for restoring the archived lines of the payslips"""
+        self.env['hr.payslip.archive']._restore_payslips(self)
+
     def unlink(self):
         """Function for unlink the Payslip"""
         if any(self.filtered(
@@ -189,6 +291,20 @@ class HrPayslip(models.Model):
         @return: returns the ids of all the contracts for the given employee
         that need to be considered for the given dates
         """
+        return self._get_contracts_by_employee(
+            employee, date_from, date_to).get(
+            employee.id, self.env['hr.contract']).ids
+
+    @api.model
+    def _get_contracts_by_employee(self, employees, date_from, date_to):
+        """
+        @param employees: recordset of employees
+        @param date_from: date_field
+        @param date_to: date_field
+        @return: a dict {employee_id: contracts} with the contracts to
+        consider for each employee between the given dates, fetched in a
+        single query
+        """
         # a contract is valid if it ends between the given dates
         clause_1 = ['&', ('date_end', '<=', date_to),
                     ('date_end', '>=', date_from)]
@@ -199,29 +315,207 @@ class HrPayslip(models.Model):
         # date_end (or never finish)
         clause_3 = ['&', ('date_start', '<=', date_from), '|',
                     ('date_end', '=', False), ('date_end', '>=', date_to)]
-        clause_final = [('employee_id', '=', employee.id),
+        clause_final = [('employee_id', 'in', employees.ids),
                         ('state', '=', 'open'), '|',
                         '|'] + clause_1 + clause_2 + clause_3
-        return self.env['hr.contract'].search(clause_final).ids
+        result = {employee.id: self.env['hr.contract'] for employee in
+                  employees}
+        for contract in self.env['hr.contract'].search(clause_final):
+            result[contract.employee_id.id] |= contract
+        return result
+
+    @api.model
+    def _prepare_payslip_run_values(self, payslip_run, employees):
+        """
+        @param payslip_run: hr.payslip.run the payslips are generated for
+        @param employees: recordset of employees
+        @return: the list of values creating the payslips of the employees,
+        filled as onchange_employee_id does it for a single employee
+        """
+        date_from = payslip_run.date_start
+        date_to = payslip_run.date_end
+        ttyme = datetime.combine(fields.Date.from_string(date_from), time.min)
+        locale = self.env.context.get('lang') or 'en_US'
+        period = tools.ustr(babel.dates.format_date(
+            date=ttyme, format='MMMM-y', locale=locale))
+        contracts_by_employee = self._get_contracts_by_employee(
+            employees, date_from, date_to)
+        # prefetch the calendars and the structures of all the contracts
+        all_contracts = self.env['hr.contract'].concat(
+            *contracts_by_employee.values())
+        all_contracts.mapped('resource_calendar_id')
+        all_contracts.mapped('struct_id')._get_parent_structure()
+        # compute the worked days of all the employees at once
+        worked_days_by_contract = self._get_worked_day_lines_batch(
+            self.env['hr.contract'].concat(*(
+                contracts for contracts in contracts_by_employee.values()
+                if contracts[:1].struct_id)), date_from, date_to)
+        vals_list = []
+        for employee in employees:
+            contracts = contracts_by_employee[employee.id]
+            contract = contracts[:1]
+            worked_days_line_ids = []
+            input_line_ids = []
+            if contract.struct_id:
+                for each in contracts:
+                    worked_days_line_ids += worked_days_by_contract.get(
+                        each.id, [])
+                input_line_ids = self.get_inputs(contracts, date_from, date_to)
+            vals_list.append({
+                'employee_id': employee.id,
+                'name': _('Salary Slip of %s for %s') % (employee.name,
+                                                          period),
+                'struct_id': contract.struct_id.id,
+                'contract_id': contract.id,
+                'payslip_run_id': payslip_run.id,
+                'input_line_ids': [(0, 0, x) for x in input_line_ids],
+                'worked_days_line_ids': [(0, 0, x) for x in
+                                         worked_days_line_ids],
+                'date_from': date_from,
+                'date_to': date_to,
+                'credit_note': payslip_run.credit_note,
+                'company_id': employee.company_id.id,
+            })
+        return vals_list
 
     def action_compute_sheet(self):
-        """Function for compute Payslip sheet"""
-        for payslip in self:
-            number = payslip.number or self.env['ir.sequence'].next_by_code(
-                'salary.slip')
+        """Function for compute Payslip sheet. With the payslip_incremental
+        key in the context, the payslips whose fingerprint did not change
+        are skipped and only the lines which changed are rewritten."""
+        incremental = self.env.context.get('payslip_incremental')
+        if not incremental:
             # delete old payslip lines
-            payslip.line_ids.unlink()
+            self.mapped('line_ids').unlink()
+        # load the payslip history of all the employees at once
+        ledger = PayslipLedger(self.env, self.mapped('employee_id').ids)
+        profiler = None
+        if self.env.context.get('payslip_profile'):
+            profiler = RuleProfiler(self.env.cr)
+        payslip_obj = self.with_context(payslip_ledger=ledger,
+                                        payslip_rule_versions={},
+                                        payslip_rule_profiler=profiler)
+        # fetch the current contracts of the employees of the payslips
+        # without contract, with one query per period
+        employees_by_period = defaultdict(lambda: self.env['hr.employee'])
+        for payslip in self.filtered(lambda slip: not slip.contract_id):
+            employees_by_period[payslip.date_from, payslip.date_to] |= \
+                payslip.employee_id
+        contracts_by_period = {
+            period: self._get_contracts_by_employee(employees, *period)
+            for period, employees in employees_by_period.items()}
+        lines = []
+        lines_by_slip = {}
+        for payslip in self:
+            if not payslip.number:
+                payslip.number = self.env['ir.sequence'].next_by_code(
+                    'salary.slip')
             # set the list of contract for which the rules have to be applied
             # if we don't give the contract, then the rules to apply should be
             # for all current contracts of the employee
-            contract_ids = payslip.contract_id.ids or \
-                           self.get_contract(payslip.employee_id,
-                                             payslip.date_from, payslip.date_to)
-            lines = [(0, 0, line) for line in
-                     self._get_payslip_lines(contract_ids, payslip.id)]
-            payslip.write({'line_ids': lines, 'number': number})
+            contract_ids = payslip.contract_id.ids or contracts_by_period[
+                payslip.date_from, payslip.date_to][payslip.employee_id.id].ids
+            fingerprint = payslip._get_compute_fingerprint(
+                self.env['hr.contract'].browse(contract_ids))
+            if incremental and payslip.line_ids and \
+                    payslip.compute_fingerprint == fingerprint:
+                continue
+            if payslip.compute_fingerprint != fingerprint:
+                payslip.compute_fingerprint = fingerprint
+            lines_by_slip[payslip.id] = []
+            for line in payslip_obj._get_payslip_lines(contract_ids,
+                                                       payslip.id):
+                line['slip_id'] = payslip.id
+                lines.append(line)
+                lines_by_slip[payslip.id].append(line)
+        if incremental:
+            self.browse(list(lines_by_slip))._update_payslip_lines(
+                lines_by_slip)
+        else:
+            # write the lines of all the payslips at once
+            self.env['hr.payslip.line'].create(lines)
+        if profiler is not None:
+            self.env['hr.payslip.run.rule.stat']._record_profile(profiler)
         return True
 
+    def _get_payslip_structure_ids(self, contracts):
+        """
+        @param contracts: recordset of the contracts the rules are applied for
+        @return: the ids of the structures of the payslip, or else of the
+        contracts, and their parents
+        """
+        self.ensure_one()
+        if len(contracts) == 1 and self.struct_id:
+            return self.struct_id._get_parent_structure_ids()
+        return contracts.get_all_structures()
+
+    def _get_compute_fingerprint(self, contracts):
+        """
+        @param contracts: recordset of the contracts the rules are applied for
+        @return: a hash of everything the computation of the payslip depends
+        on: its period, contracts, worked days, inputs and salary rules
+        """
+        self.ensure_one()
+        rule_ids = self.env['hr.payroll.structure']._get_rule_plan(
+            self._get_payslip_structure_ids(contracts))
+        data = (
+            self.employee_id.id, str(self.date_from), str(self.date_to),
+            bool(self.credit_note), self.struct_id.id,
+            [(contract.id, str(contract.write_date)) for contract in
+             contracts],
+            sorted((line.code, line.contract_id.id, line.number_of_days,
+                    line.number_of_hours) for line in
+                   self.worked_days_line_ids),
+            sorted((line.code, line.contract_id.id, line.amount) for line in
+                   self.input_line_ids),
+            [(rule.id, str(rule.write_date)) for rule in
+             self.env['hr.salary.rule'].browse(rule_ids)],
+        )
+        return hashlib.sha256(repr(data).encode()).hexdigest()
+
+    def _update_payslip_lines(self, lines_by_slip):
+        """
+        Rewrite the lines of the payslips with the computed ones, matched by
+        salary rule and contract: only the values which changed are written,
+        the floats being compared at the precision of their fields, the
+        missing lines are created and the obsolete ones deleted.
+        @param lines_by_slip: dict {payslip_id: list of line values}
+        """
+        line_obj = self.env['hr.payslip.line']
+        to_create = []
+        to_unlink = line_obj
+        for payslip in self:
+            existing = defaultdict(list)
+            for line in payslip.line_ids:
+                existing[line.salary_rule_id.id, line.contract_id.id].append(
+                    line)
+            for vals in lines_by_slip.get(payslip.id, []):
+                matching = existing.get(
+                    (vals['salary_rule_id'], vals['contract_id']))
+                if not matching:
+                    to_create.append(vals)
+                    continue
+                line = matching.pop(0)
+                changes = {}
+                for fname, value in vals.items():
+                    field = line._fields[fname]
+                    digits = field.type == 'float' and field.get_digits(
+                        self.env)
+                    if digits:
+                        changed = float_compare(
+                            line[fname], value,
+                            precision_digits=digits[1]) != 0
+                    else:
+                        changed = field.convert_to_write(
+                            line[fname], line) != value
+                    if changed:
+                        changes[fname] = value
+                if changes:
+                    line.write(changes)
+            for lines in existing.values():
+                to_unlink |= line_obj.concat(*lines)
+        to_unlink.unlink()
+        line_obj.create(to_create)
+
     @api.model
     def get_worked_day_lines(self, contracts, date_from, date_to):
         """
@@ -230,84 +524,124 @@ class HrPayslip(models.Model):
         applied for the given contract between date_from and date_to
         """
         res = []
+        lines_by_contract = self._get_worked_day_lines_batch(
+            contracts, date_from, date_to)
+        for contract in contracts:
+            res.extend(lines_by_contract.get(contract.id, []))
+        return res
+
+    @api.model
+    def _get_worked_day_lines_batch(self, contracts, date_from, date_to):
+        """
+        @param contracts: Browse record of contracts, date_from, date_to
+        @return: returns a dict {contract_id: worked days lines}, the
+        attendance and leave intervals being computed once per working
+        schedule for the employees of all the given contracts
+        """
+        res = {}
+        day_from = datetime.combine(fields.Date.from_string(date_from),
+                                    time.min)
+        day_to = datetime.combine(fields.Date.from_string(date_to), time.max)
         # fill only if the contract as a working schedule linked
+        contracts_by_calendar = defaultdict(lambda: self.env['hr.contract'])
         for contract in contracts.filtered(
                 lambda contract: contract.resource_calendar_id):
-            day_from = datetime.combine(fields.Date.from_string(date_from),
-                                        time.min)
-            day_to = datetime.combine(fields.Date.from_string(date_to),
-                                      time.max)
-            # compute leave days
-            leaves = {}
-            calendar = contract.resource_calendar_id
+            contracts_by_calendar[contract.resource_calendar_id] |= contract
+        for calendar, calendar_contracts in contracts_by_calendar.items():
             tz = timezone(calendar.tz)
-            day_leave_intervals = contract.employee_id.list_leaves(
-                day_from, day_to, calendar=contract.resource_calendar_id)
-            multi_leaves = []
-            for day, hours, leave in day_leave_intervals:
-                work_hours = calendar.get_work_hours_count(
-                    tz.localize(datetime.combine(day, time.min)),
-                    tz.localize(datetime.combine(day, time.max)),
-                    compute_leaves=False,
-                )
-                if len(leave) > 1:
-                    for each in leave:
-                        if each.holiday_id:
-                            multi_leaves.append(each.holiday_id)
-                else:
-                    holiday = leave.holiday_id
-                    current_leave_struct = leaves.setdefault(
-                        holiday.holiday_status_id, {
-                            'name': holiday.holiday_status_id.name or _(
-                                'Global Leaves'),
-                            'sequence': 5,
-                            'code': holiday.holiday_status_id.code or 'GLOBAL',
-                            'number_of_days': 0.0,
-                            'number_of_hours': 0.0,
-                            'contract_id': contract.id,
-                        })
-                    current_leave_struct['number_of_hours'] += hours
-                    if work_hours:
-                        current_leave_struct[
-                            'number_of_days'] += hours / work_hours
-            # compute worked days
-            work_data = contract.employee_id.get_work_days_data(
-                day_from, day_to, calendar=contract.resource_calendar_id)
-            attendances = {
-                'name': _("Normal Working Days paid at 100%"),
-                'sequence': 1,
-                'code': 'WORK100',
-                'number_of_days': work_data['days'],
-                'number_of_hours': work_data['hours'],
-                'contract_id': contract.id,
-            }
-            res.append(attendances)
-            uniq_leaves = [*set(multi_leaves)]
-            c_leaves = {}
-            for rec in uniq_leaves:
-                duration = rec.duration_display.replace("days", "").strip()
-                duration_in_hours = float(duration) * 24
-                c_leaves.setdefault(rec.holiday_status_id,
-                                    {'hours': duration_in_hours})
-            for item in c_leaves:
-                if not leaves or item not in leaves:
-                    data = {
-                        'name': item.name,
-                        'sequence': 20,
-                        'code': item.code or 'LEAVES',
-                        'number_of_hours': c_leaves[item]['hours'],
-                        'number_of_days': c_leaves[item][
-                                              'hours'] / work_hours,
+            employees = calendar_contracts.mapped('employee_id')
+            leaves_by_employee = employees._list_leaves_batch(
+                day_from, day_to, calendar=calendar)
+            work_data_by_employee = employees._get_work_days_data_batch(
+                day_from, day_to, calendar=calendar)
+            # working hours of the schedule per day, with one day margin as
+            # the leave days are expressed in the timezone of the employees
+            work_hours_by_day = hours_per_day(
+                calendar._attendance_intervals_batch(
+                    tz.localize(datetime.combine(
+                        day_from.date() - timedelta(days=1), time.min)),
+                    tz.localize(datetime.combine(
+                        day_to.date() + timedelta(days=1), time.max)))[False])
+            for contract in calendar_contracts:
+                res[contract.id] = self._get_contract_worked_day_lines(
+                    contract, leaves_by_employee[contract.employee_id.id],
+                    work_data_by_employee[contract.employee_id.id],
+                    work_hours_by_day)
+        return res
+
+    @api.model
+    def _get_contract_worked_day_lines(self, contract, day_leave_intervals,
+                                       work_data, work_hours_by_day):
+        """
+        @param contract: Browse record of contract
+        @param day_leave_intervals: leave days of the employee of the contract
+        @param work_data: worked days and hours of the employee
+        @param work_hours_by_day: working hours of the schedule per day
+        @return: returns a list of dict containing the worked days lines of
+        the contract
+        """
+        res = []
+        # compute leave days
+        leaves = {}
+        multi_leaves = []
+        for day, hours, leave in day_leave_intervals:
+            work_hours = work_hours_by_day[day]
+            if len(leave) > 1:
+                for each in leave:
+                    if each.holiday_id:
+                        multi_leaves.append(each.holiday_id)
+            else:
+                holiday = leave.holiday_id
+                current_leave_struct = leaves.setdefault(
+                    holiday.holiday_status_id, {
+                        'name': holiday.holiday_status_id.name or _(
+                            'Global Leaves'),
+                        'sequence': 5,
+                        'code': holiday.holiday_status_id.code or 'GLOBAL',
+                        'number_of_days': 0.0,
+                        'number_of_hours': 0.0,
                         'contract_id': contract.id,
-                    }
-                    res.append(data)
-                for time_off in leaves:
-                    if item == time_off:
-                        leaves[item]['number_of_hours'] += c_leaves[item][
-                            'hours']
-                        leaves[item]['number_of_days'] \
-                            += c_leaves[item]['hours'] / work_hours
-            res.extend(leaves.values())
+                    })
+                current_leave_struct['number_of_hours'] += hours
+                if work_hours:
+                    current_leave_struct[
+                        'number_of_days'] += hours / work_hours
+        # compute worked days
+        attendances = {
+            'name': _("Normal Working Days paid at 100%"),
+            'sequence': 1,
+            'code': 'WORK100',
+            'number_of_days': work_data['days'],
+            'number_of_hours': work_data['hours'],
+            'contract_id': contract.id,
+        }
+        res.append(attendances)
+        uniq_leaves = [*set(multi_leaves)]
+        c_leaves = {}
+        for rec in uniq_leaves:
+            duration = rec.duration_display.replace("days", "").strip()
+            duration_in_hours = float(duration) * 24
+            c_leaves.setdefault(rec.holiday_status_id,
+                                {'hours': duration_in_hours})
+        for item in c_leaves:
+            if not leaves or item not in leaves:
+                data = {
+                    'name': item.name,
+                    'sequence': 20,
+                    'code': item.code or 'LEAVES',
+                    'number_of_hours': c_leaves[item]['hours'],
+                    'number_of_days': c_leaves[item][
+                                          'hours'] / work_hours,
+                    'contract_id': contract.id,
+                }
+                res.append(data)
+            for time_off in leaves:
+                if item == time_off:
+                    leaves[item]['number_of_hours'] += c_leaves[item][
+                        'hours']
+                    leaves[item]['number_of_days'] \
+                        += c_leaves[item]['hours'] / work_hours
+        res.extend(leaves.values())
         return res
 
     @api.model
@@ -315,10 +649,8 @@ class HrPayslip(models.Model):
         """Function for getting contracts upon date_from and date_to fields"""
         res = []
         structure_ids = contracts.get_all_structures()
-        rule_ids = self.env['hr.payroll.structure'].browse(
-            structure_ids).get_all_rules()
-        sorted_rule_ids = [id for id, sequence in
-                           sorted(rule_ids, key=lambda x: x[1])]
+        sorted_rule_ids = self.env['hr.payroll.structure']._get_rule_plan(
+            structure_ids)
         inputs = self.env['hr.salary.rule'].browse(sorted_rule_ids).mapped(
             'input_ids')
         for contract in contracts:
@@ -349,129 +681,55 @@ class HrPayslip(models.Model):
                 category.code] + amount or amount
             return localdict
 
-        class BrowsableObject(object):
-            """Class for Browsable Object"""
-
-            def __init__(self, employee_id, dict, env):
-                """Function for getting employee_id,dict and env"""
-                self.employee_id = employee_id
-                self.dict = dict
-                self.env = env
-
-            def __getattr__(self, attr):
-                """Function for return dict"""
-                return attr in self.dict and self.dict.__getitem__(attr) or 0.0
-
-        class InputLine(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""
-                    SELECT sum(amount) as sum
-                    FROM hr_payslip as hp, hr_payslip_input as pi
-                    WHERE hp.employee_id = %s AND hp.state = 'done'
-                    AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id = 
-                    pi.payslip_id AND pi.code = %s""",
-                                    (
-                                        self.employee_id, from_date, to_date,
-                                        code))
-                return self.env.cr.fetchone()[0] or 0.0
-
-        class WorkedDays(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def _sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip days with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""
-                    SELECT sum(number_of_days) as number_of_days, 
-                    sum(number_of_hours) as number_of_hours
-                    FROM hr_payslip as hp, hr_payslip_worked_days as pi
-                    WHERE hp.employee_id = %s AND hp.state = 'done'
-                    AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id = 
-                    pi.payslip_id AND pi.code = %s""",
-                                    (
-                                        self.employee_id, from_date, to_date,
-                                        code))
-                return self.env.cr.fetchone()
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                res = self._sum(code, from_date, to_date)
-                return res and res[0] or 0.0
-
-            def sum_hours(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip hours with respect to
-                 from_date,to_date fields"""
-                res = self._sum(code, from_date, to_date)
-                return res and res[1] or 0.0
-
-        class Payslips(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""SELECT sum(case when hp.credit_note = 
-                False then (pl.total) else (-pl.total) end)
-                FROM hr_payslip as hp, hr_payslip_line as pl
-                WHERE hp.employee_id = %s AND hp.state = 'done'
-                AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id 
-                = pl.slip_id AND pl.code = %s""",
-                                    (
-                                        self.employee_id, from_date, to_date,
-                                        code))
-                res = self.env.cr.fetchone()
-                return res and res[0] or 0.0
-
         # we keep a dict with the result because a value can be overwritten
         # by another rule with the same code
         result_dict = {}
         rules_dict = {}
         worked_days_dict = {}
         inputs_dict = {}
-        blacklist = []
+        blacklist = set()
         payslip = self.env['hr.payslip'].browse(payslip_id)
         for worked_days_line in payslip.worked_days_line_ids:
             worked_days_dict[worked_days_line.code] = worked_days_line
         for input_line in payslip.input_line_ids:
             inputs_dict[input_line.code] = input_line
-        categories = BrowsableObject(payslip.employee_id.id, {}, self.env)
-        inputs = InputLine(payslip.employee_id.id, inputs_dict, self.env)
-        worked_days = WorkedDays(payslip.employee_id.id, worked_days_dict,
-                                 self.env)
-        payslips = Payslips(payslip.employee_id.id, payslip, self.env)
-        rules = BrowsableObject(payslip.employee_id.id, rules_dict, self.env)
+        # the history helpers share the ledger loaded for the whole batch,
+        # or a ledger of the employee loaded on first use
+        employee_id = payslip.employee_id.id
+        ledger = self.env.context.get('payslip_ledger')
+        if ledger is None or employee_id not in ledger.employee_ids:
+            ledger = PayslipLedger(self.env, [employee_id])
+        categories = BrowsableObject(employee_id, {}, self.env)
+        inputs = InputLine(employee_id, inputs_dict, self.env, ledger)
+        worked_days = WorkedDays(employee_id, worked_days_dict, self.env,
+                                 ledger)
+        payslips = Payslips(employee_id, payslip, self.env, ledger)
+        rules = BrowsableObject(employee_id, rules_dict, self.env)
         baselocaldict = {'categories': categories, 'rules': rules,
                          'payslip': payslips, 'worked_days': worked_days,
                          'inputs': inputs}
         # get the ids of the structures on the contracts and their
         # parent id as well
         contracts = self.env['hr.contract'].browse(contract_ids)
-        if len(contracts) == 1 and payslip.struct_id:
-            structure_ids = list(
-                set(payslip.struct_id._get_parent_structure().ids))
-        else:
-            structure_ids = contracts.get_all_structures()
-        # get the rules of the structure and thier children
-        rule_ids = self.env['hr.payroll.structure'].browse(
-            structure_ids).get_all_rules()
-        # run the rules by sequence
-        sorted_rule_ids = [id for id, sequence in
-                           sorted(rule_ids, key=lambda x: x[1])]
-        sorted_rules = self.env['hr.salary.rule'].browse(sorted_rule_ids)
+        structure_ids = payslip._get_payslip_structure_ids(contracts)
+        # get the rules of the structure and thier children, by sequence,
+        # without the ones which can never fire
+        rule_plan = self.env['hr.payroll.structure']._get_compiled_rule_plan(
+            structure_ids)
+        sorted_rules = self.env['hr.salary.rule'].browse(rule_plan.rule_ids)
+        # the rules are measured only when the profiling is enabled
+        profiler = self.env.context.get('payslip_rule_profiler')
+        if profiler is not None:
+            profiler.run_id = payslip.payslip_run_id.id
+        # versions of the rules, shared by the payslips of the batch
+        rule_versions = self.env.context.get('payslip_rule_versions')
+        if rule_versions is None:
+            rule_versions = {}
+        missing_rules = sorted_rules.filtered(
+            lambda rule: rule.id not in rule_versions)
+        if missing_rules:
+            rule_versions.update(self.env[
+                'hr.salary.rule.version']._get_versions(missing_rules))
         for contract in contracts:
             employee = contract.employee_id
             localdict = dict(baselocaldict, employee=employee,
@@ -482,10 +740,15 @@ class HrPayslip(models.Model):
                 localdict['result_qty'] = 1.0
                 localdict['result_rate'] = 100
                 # check if the rule can be applied
-                if rule._satisfy_condition(
-                        localdict) and rule.id not in blacklist:
+                if (rule.id in rule_plan.always_true or (
+                        rule._satisfy_condition(localdict)
+                        if profiler is None else
+                        profiler.satisfy_condition(rule, localdict))) and \
+                        rule.id not in blacklist:
                     # compute the amount of the rule
-                    amount, qty, rate = rule._compute_rule(localdict)
+                    amount, qty, rate = rule._compute_rule(localdict) \
+                        if profiler is None else \
+                        profiler.compute_rule(rule, localdict)
                     # check if there is already a rule computed with that code
                     previous_amount = rule.code in localdict and localdict[
                         rule.code] or 0.0
@@ -507,15 +770,8 @@ class HrPayslip(models.Model):
                         'sequence': rule.sequence,
                         'appears_on_payslip': rule.appears_on_payslip,
                         'condition_select': rule.condition_select,
-                        'condition_python': rule.condition_python,
-                        'condition_range': rule.condition_range,
-                        'condition_range_min': rule.condition_range_min,
-                        'condition_range_max': rule.condition_range_max,
                         'amount_select': rule.amount_select,
-                        'amount_fix': rule.amount_fix,
-                        'amount_python_compute': rule.amount_python_compute,
-                        'amount_percentage': rule.amount_percentage,
-                        'amount_percentage_base': rule.amount_percentage_base,
+                        'rule_version_id': rule_versions[rule.id].id,
                         'register_id': rule.register_id.id,
                         'amount': amount,
                         'employee_id': contract.employee_id.id,
@@ -524,8 +780,7 @@ class HrPayslip(models.Model):
                     }
                 else:
                     # blacklist this rule and its children
-                    blacklist += [id for id, seq in
-                                  rule._recursive_search_of_rules()]
+                    blacklist.update(rule._get_recursive_rule_ids())
         return list(result_dict.values())
 
     # YTI
@@ -623,20 +878,42 @@ class HrPayslip(models.Model):
         if self.contract_id:
             contract_ids = self.contract_id.ids
         # computation of the salary input
-        contracts = self.env['hr.contract'].browse(contract_ids)
-        worked_days_line_ids = self.get_worked_day_lines(contracts, date_from,
-                                                         date_to)
-        worked_days_lines = self.worked_days_line_ids.browse([])
-        for r in worked_days_line_ids:
-            worked_days_lines += worked_days_lines.new(r)
-        self.worked_days_line_ids = worked_days_lines
-        input_line_ids = self.get_inputs(contracts, date_from, date_to)
-        input_lines = self.input_line_ids.browse([])
-        for r in input_line_ids:
-            input_lines += input_lines.new(r)
-        self.input_line_ids = input_lines
+        self._set_worked_days_and_inputs(
+            self.env['hr.contract'].browse(contract_ids), date_from, date_to)
         return
 
+    def _get_onchange_worked_days_and_inputs(self, contracts, date_from,
+                                             date_to):
+        """
+        Function for getting the worked days and the inputs of contracts for
+        the onchange methods. The results are cached per contracts and
+        period for the current transaction, as editing a payslip chains the
+        onchanges of the employee, the contract and the dates.
+        @return: (values of the worked days, values of the inputs)
+        """
+        if not contracts:
+            return (self.get_worked_day_lines(contracts, date_from, date_to),
+                    self.get_inputs(contracts, date_from, date_to))
+        cache = self.env.cr.precommit.data.setdefault(
+            'hr_payroll_community.payslip_onchange', {})
+        key = (tuple(contracts.ids), date_from, date_to)
+        if key not in cache:
+            cache[key] = (
+                self.get_worked_day_lines(contracts, date_from, date_to),
+                self.get_inputs(contracts, date_from, date_to))
+        return cache[key]
+
+    def _set_worked_days_and_inputs(self, contracts, date_from, date_to):
+        """Function for replacing the worked days and the inputs of the
+        payslip, all the virtual lines being set in one assignment"""
+        worked_days_line_ids, input_line_ids = \
+            self._get_onchange_worked_days_and_inputs(contracts, date_from,
+                                                      date_to)
+        self.worked_days_line_ids = [(5, 0, 0)] + [
+            (0, 0, dict(vals)) for vals in worked_days_line_ids]
+        self.input_line_ids = [(5, 0, 0)] + [
+            (0, 0, dict(vals)) for vals in input_line_ids]
+
     @api.onchange('contract_id')
     def onchange_contract_id(self):
         """Function for getting structure when changing contract"""
@@ -663,22 +940,8 @@ class HrPayslip(models.Model):
         if self.contract_id:
             contract_ids = self.contract_id.ids
         # # computation of the salary input
-        contracts = self.env['hr.contract'].browse(contract_ids)
-        worked_days_line_ids = self.get_worked_day_lines(contracts, date_from,
-                                                         date_to)
-        worked_days_lines = self.worked_days_line_ids.browse([])
-        for r in worked_days_line_ids:
-            worked_days_lines += worked_days_lines.new(r)
-        self.worked_days_line_ids = worked_days_lines
-        input_line_ids = self.get_inputs(contracts, date_from, date_to)
-        input_lines = self.input_line_ids.browse([])
-        for r in input_line_ids:
-            input_lines += input_lines.new(r)
-        self.input_line_ids = input_lines
-        if self.line_ids.search([('name', '=', 'Meal Voucher')]):
-            self.line_ids.search(
-                [('name', '=', 'Meal Voucher')]).salary_rule_id.write(
-                {'quantity': self.worked_days_line_ids.number_of_days})
+        self._set_worked_days_and_inputs(
+            self.env['hr.contract'].browse(contract_ids), date_from, date_to)
         return
 
     @api.onchange('date_to')
@@ -692,20 +955,6 @@ class HrPayslip(models.Model):
         if self.contract_id:
             contract_ids = self.contract_id.ids
         # computation of the salary input
-        contracts = self.env['hr.contract'].browse(contract_ids)
-        worked_days_line_ids = self.get_worked_day_lines(contracts, date_from,
-                                                         date_to)
-        worked_days_lines = self.worked_days_line_ids.browse([])
-        for r in worked_days_line_ids:
-            worked_days_lines += worked_days_lines.new(r)
-        self.worked_days_line_ids = worked_days_lines
-        input_line_ids = self.get_inputs(contracts, date_from, date_to)
-        input_lines = self.input_line_ids.browse([])
-        for r in input_line_ids:
-            input_lines += input_lines.new(r)
-        self.input_line_ids = input_lines
-        if self.line_ids.search([('name', '=', 'Meal Voucher')]):
-            self.line_ids.search(
-                [('name', '=', 'Meal Voucher')]).salary_rule_id.write(
-                {'quantity': self.worked_days_line_ids.number_of_days})
+        self._set_worked_days_and_inputs(
+            self.env['hr.contract'].browse(contract_ids), date_from, date_to)
         return
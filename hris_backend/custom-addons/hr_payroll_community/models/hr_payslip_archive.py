@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, models
+from odoo.tools import create_index, create_unique_index, split_every
+
+_logger = logging.getLogger(__name__)
+
+# Number of payslips archived and committed together
+PAYSLIP_ARCHIVE_CHUNK_SIZE = 500
+# Data of the payslips moved to the archive tables: {model: inverse field}
+PAYSLIP_ARCHIVE_MODELS = {
+    'hr.payslip.line': 'slip_id',
+    'hr.payslip.worked.days': 'payslip_id',
+    'hr.payslip.input': 'payslip_id',
+}
+
+
+class HrPayslipArchive(models.AbstractModel):
+    """Archive of the done payslips older than the configured horizon. The
+    lines, worked days and inputs of every archived payslip are moved with
+    their ids to yearly tables inheriting from their own table, such as
+    hr_payslip_line_archive_2023. PostgreSQL reads the inheriting tables
+    together with their parent, so the payslips, reports, exports and the
+    history ledger keep reading the archived records through the usual
+    models, while the parent tables and their indexes only hold the recent
+    payslips. The archived payslips cannot change state until their Restore
+    Lines button moves their records back."""
+    _name = 'hr.payslip.archive'
+    _description = 'Payslip Archive'
+
+    @api.model
+    def _get_cutoff_date(self):
+        """
+        @return: the date the payslips ending before are archived, None when
+        the archive is disabled
+        """
+        horizon = int(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_payroll_community.payslip_archive_horizon', 0))
+        if horizon <= 0:
+            return None
+        return date.today() - relativedelta(months=horizon)
+
+    @api.model
+    def _cron_archive_payslips(self):
+        """Cron entry point: archive the done payslips older than the
+        horizon, one chunk per transaction"""
+        cutoff = self._get_cutoff_date()
+        if not cutoff:
+            return
+        payslips = self.env['hr.payslip'].search(
+            [('state', '=', 'done'), ('archived', '=', False),
+             ('date_to', '<', cutoff)], order='date_to, id')
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        done = 0
+        for payslip_ids in split_every(PAYSLIP_ARCHIVE_CHUNK_SIZE,
+                                       payslips.ids):
+            self._archive_payslips(self.env['hr.payslip'].browse(payslip_ids))
+            done += len(payslip_ids)
+            _logger.info("Payslip archive: %s/%s payslips archived", done,
+                         len(payslips))
+            if auto_commit:
+                self.env.cr.commit()
+                self.env.invalidate_all()
+
+    @api.model
+    def _get_archive_table(self, model, year):
+        """Function for creating when missing the archive table of a model
+        for a year, inheriting from the table of the model
+        @return: the name of the archive table"""
+        table = self.env[model]._table
+        archive_table = '%s_archive_%s' % (table, year)
+        self.env.cr.execute("SELECT to_regclass(%s)", (archive_table,))
+        if not self.env.cr.fetchone()[0]:
+            self.env.cr.execute('CREATE TABLE "%s" () INHERITS ("%s")' % (
+                archive_table, table))
+            create_unique_index(self.env.cr, '%s_id_index' % archive_table,
+                                archive_table, ['id'])
+            create_index(self.env.cr, '%s_%s_index' % (
+                archive_table, PAYSLIP_ARCHIVE_MODELS[model]), archive_table,
+                         [PAYSLIP_ARCHIVE_MODELS[model]])
+        return archive_table
+
+    @api.model
+    def _move_rows(self, model, source, target, payslip_ids):
+        """Function for moving the rows of payslips between the table of a
+        model and one of its archive tables, keeping their ids
+        @param source: table the rows are deleted from, only its own rows
+        being read
+        @param target: table the rows are inserted into"""
+        self.env.cr.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = %s ORDER BY ordinal_position""",
+                            (self.env[model]._table,))
+        columns = ', '.join('"%s"' % row[0] for row in self.env.cr.fetchall())
+        self.env.cr.execute("""
+            WITH moved AS (
+                DELETE FROM ONLY "{source}" WHERE "{inverse}" IN %s
+                RETURNING {columns}
+            )
+            INSERT INTO "{target}" ({columns})
+            SELECT {columns} FROM moved""".format(
+            source=source, target=target, columns=columns,
+            inverse=PAYSLIP_ARCHIVE_MODELS[model]), (tuple(payslip_ids),))
+
+    @api.model
+    def _get_payslip_ids_by_year(self, payslips):
+        """
+        @return: {year: ids of the payslips ending that year}
+        """
+        payslip_ids = defaultdict(list)
+        for payslip in payslips:
+            payslip_ids[payslip.date_to.year].append(payslip.id)
+        return payslip_ids
+
+    @api.model
+    def _archive_payslips(self, payslips):
+        """Function for moving the data of done payslips to the archive
+        tables of the year they end
+        @param payslips: recordset of done hr.payslip"""
+        payslips = payslips.filtered(
+            lambda slip: slip.state == 'done' and not slip.archived)
+        if not payslips:
+            return
+        for model in PAYSLIP_ARCHIVE_MODELS:
+            self.env[model].flush_model()
+        for year, payslip_ids in self._get_payslip_ids_by_year(
+                payslips).items():
+            for model in PAYSLIP_ARCHIVE_MODELS:
+                self._move_rows(model, self.env[model]._table,
+                                self._get_archive_table(model, year),
+                                payslip_ids)
+        payslips.write({'archived': True})
+
+    @api.model
+    def _restore_payslips(self, payslips):
+        """Function for moving back the archived data of payslips to the
+        tables of their lines, worked days and inputs
+        @param payslips: recordset of archived hr.payslip"""
+        payslips = payslips.filtered('archived')
+        if not payslips:
+            return
+        for year, payslip_ids in self._get_payslip_ids_by_year(
+                payslips).items():
+            for model in PAYSLIP_ARCHIVE_MODELS:
+                self._move_rows(model, self._get_archive_table(model, year),
+                                self.env[model]._table, payslip_ids)
+        payslips.write({'archived': False})
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from collections import defaultdict
+
+from odoo import fields, models
+from odoo.tools import create_index
+
+
+class PayslipLedger(object):
+    """In-memory copy of the ledger of a set of employees, loaded lazily per
+    kind and code the first time a salary rule asks for them, with a single
+    query for all the employees. It answers the payslip.sum, inputs.sum and
+    worked_days.sum helpers of the salary rules without any further query,
+    while holding only the history of the codes the rules actually read."""
+
+    def __init__(self, env, employee_ids):
+        """Function for getting env and the ids of the employees"""
+        self.env = env
+        self.employee_ids = frozenset(employee_ids)
+        self._rows = {}
+
+    def _load(self, kind, code):
+        """Function for loading the ledger rows of the employees for a kind
+        and code
+        @return: {employee_id: [(date_from, date_to, amount, number_of_days,
+        number_of_hours)]}"""
+        rows = self._rows[kind, code] = defaultdict(list)
+        if not self.employee_ids:
+            return rows
+        self.env.cr.execute("""
+            SELECT employee_id, date_from, date_to, amount, number_of_days,
+                   number_of_hours
+            FROM hr_payslip_ledger
+            WHERE employee_id IN %s AND kind = %s AND code = %s""",
+                            (tuple(self.employee_ids), kind, code))
+        for (employee_id, date_from, date_to, amount, number_of_days,
+             number_of_hours) in self.env.cr.fetchall():
+            rows[employee_id].append(
+                (date_from, date_to, amount, number_of_days, number_of_hours))
+        return rows
+
+    def sum(self, employee_id, kind, code, from_date, to_date):
+        """
+        @param employee_id: id of the employee
+        @param kind: kind of the ledger rows (line, input or worked_days)
+        @param code: code of the line, input or worked days
+        @return: the (amount, number_of_days, number_of_hours) totals of the
+        done payslips of the employee between the given dates, None values
+        when there is no such payslip
+        """
+        rows = self._rows.get((kind, code))
+        if rows is None:
+            rows = self._load(kind, code)
+        from_date = fields.Date.to_date(from_date)
+        to_date = fields.Date.to_date(to_date)
+        amount = number_of_days = number_of_hours = None
+        for (date_from, date_to, row_amount, row_days,
+             row_hours) in rows.get(employee_id, ()):
+            if date_from >= from_date and date_to <= to_date:
+                amount = (amount or 0.0) + row_amount
+                number_of_days = (number_of_days or 0.0) + row_days
+                number_of_hours = (number_of_hours or 0.0) + row_hours
+        return amount, number_of_days, number_of_hours
+
+
+class HrPayslipLedger(models.Model):
+    """Create new model for the history ledger of the done payslips, holding
+    the totals of their lines, inputs and worked days per code"""
+    _name = 'hr.payslip.ledger'
+    _description = 'Payslip History Ledger'
+    _order = 'employee_id, date_from, kind, code'
+
+    slip_id = fields.Many2one('hr.payslip', string='Pay Slip', required=True,
+                              ondelete='cascade', index=True,
+                              help="Done payslip the totals come from")
+    employee_id = fields.Many2one('hr.employee', string='Employee',
+                                  required=True, help="Employee of the payslip")
+    kind = fields.Selection([
+        ('line', 'Payslip Line'),
+        ('input', 'Input'),
+        ('worked_days', 'Worked Days'),
+    ], string='Kind', required=True, help="Payslip data the total comes from")
+    code = fields.Char(string='Code', required=True,
+                       help="Code of the lines, inputs or worked days")
+    date_from = fields.Date(string='Date From', required=True,
+                            help="Start date of the payslip")
+    date_to = fields.Date(string='Date To', required=True,
+                          help="End date of the payslip")
+    amount = fields.Float(string='Amount',
+                          help="Total of the lines, negative for a credit "
+                               "note, or of the inputs")
+    number_of_days = fields.Float(string='Number of Days',
+                                  help="Total days of the worked days")
+    number_of_hours = fields.Float(string='Number of Hours',
+                                   help="Total hours of the worked days")
+
+    def init(self):
+        """Function for indexing the ledger and filling it with the
+        payslips done before its installation"""
+        create_index(self._cr, 'hr_payslip_ledger_employee_code_index',
+                     self._table,
+                     ['employee_id', 'kind', 'code', 'date_from', 'date_to'])
+        self._cr.execute("SELECT 1 FROM hr_payslip_ledger LIMIT 1")
+        if not self._cr.fetchone():
+            self._insert_rows("hp.state = 'done'", {})
+
+    def _insert_rows(self, where, params):
+        """Function for inserting the ledger rows of the payslips matching
+        the given where clause on hr_payslip as hp"""
+        query = """
+            INSERT INTO hr_payslip_ledger (slip_id, employee_id, kind, code,
+                date_from, date_to, amount, number_of_days, number_of_hours,
+                create_uid, create_date, write_uid, write_date)
+            SELECT slip_id, employee_id, kind, code, date_from, date_to,
+                   amount, number_of_days, number_of_hours,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM (
+                SELECT hp.id AS slip_id, hp.employee_id, 'line' AS kind,
+                       pl.code, hp.date_from, hp.date_to,
+                       COALESCE(SUM(CASE WHEN hp.credit_note = False
+                           THEN pl.total ELSE -pl.total END), 0.0) AS amount,
+                       0.0 AS number_of_days, 0.0 AS number_of_hours
+                FROM hr_payslip hp
+                JOIN hr_payslip_line pl ON pl.slip_id = hp.id
+                WHERE {where} AND pl.code IS NOT NULL
+                GROUP BY hp.id, pl.code
+                UNION ALL
+                SELECT hp.id, hp.employee_id, 'input', pi.code, hp.date_from,
+                       hp.date_to, COALESCE(SUM(pi.amount), 0.0), 0.0, 0.0
+                FROM hr_payslip hp
+                JOIN hr_payslip_input pi ON pi.payslip_id = hp.id
+                WHERE {where} AND pi.code IS NOT NULL
+                GROUP BY hp.id, pi.code
+                UNION ALL
+                SELECT hp.id, hp.employee_id, 'worked_days', wd.code,
+                       hp.date_from, hp.date_to, 0.0,
+                       COALESCE(SUM(wd.number_of_days), 0.0),
+                       COALESCE(SUM(wd.number_of_hours), 0.0)
+                FROM hr_payslip hp
+                JOIN hr_payslip_worked_days wd ON wd.payslip_id = hp.id
+                WHERE {where} AND wd.code IS NOT NULL
+                GROUP BY hp.id, wd.code
+            ) AS rows""".format(where=where)
+        self._cr.execute(query, dict(params, uid=self.env.uid))
+
+    def _record_slips(self, payslips):
+        """Function for replacing the ledger rows of the given payslips by
+        the totals of the ones which are done"""
+        if not payslips:
+            return
+        for model in ('hr.payslip', 'hr.payslip.line', 'hr.payslip.input',
+                      'hr.payslip.worked.days'):
+            self.env[model].flush_model()
+        self._cr.execute("DELETE FROM hr_payslip_ledger WHERE slip_id IN %s",
+                         (tuple(payslips.ids),))
+        self._insert_rows("hp.id IN %(slip_ids)s AND hp.state = 'done'",
+                          {'slip_ids': tuple(payslips.ids)})
+        self.invalidate_model()
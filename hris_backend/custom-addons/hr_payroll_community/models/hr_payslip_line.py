@@ -54,6 +54,29 @@ class HrPayslipLine(models.Model):
     total = fields.Float(compute='_compute_total', string='Total',
                          help="Total amount for Payslip",
                          digits=dp.get_precision('Payroll'), store=True)
+    rule_version_id = fields.Many2one('hr.salary.rule.version',
+                                      string='Rule Version', readonly=True,
+                                      index=True,
+                                      help="Version of the salary rule the "
+                                           "line was computed with")
+    # the definition of the rule is read from its version instead of being
+    # copied on every line
+    condition_python = fields.Text(related='rule_version_id.condition_python',
+                                   readonly=True, required=False)
+    condition_range = fields.Char(related='rule_version_id.condition_range',
+                                  readonly=True)
+    condition_range_min = fields.Float(
+        related='rule_version_id.condition_range_min', readonly=True)
+    condition_range_max = fields.Float(
+        related='rule_version_id.condition_range_max', readonly=True)
+    amount_fix = fields.Float(related='rule_version_id.amount_fix',
+                              readonly=True)
+    amount_percentage = fields.Float(
+        related='rule_version_id.amount_percentage', readonly=True)
+    amount_python_compute = fields.Text(
+        related='rule_version_id.amount_python_compute', readonly=True)
+    amount_percentage_base = fields.Char(
+        related='rule_version_id.amount_percentage_base', readonly=True)
 
     @api.depends('quantity', 'amount', 'rate')
     def _compute_total(self):
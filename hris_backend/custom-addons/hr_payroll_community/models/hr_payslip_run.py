@@ -20,10 +20,23 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+import logging
+import threading
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
-from odoo import fields, models, _
+from odoo import api, fields, models, _
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Number of employees whose payslips are created, computed and committed
+# together when generating a batch
+PAYSLIP_RUN_CHUNK_SIZE = 100
+# Number of payslips computed by a shard in parallel mode
+PAYSLIP_RUN_SHARD_SIZE = 200
+# Number of payslips rendered together by a shard
+PAYSLIP_RUN_RENDER_SHARD_SIZE = 50
 
 
 class HrPayslipRun(models.Model):
@@ -57,6 +70,57 @@ class HrPayslipRun(models.Model):
                                       "payslips generated from here are refund"
                                       "payslips.")
     is_validate = fields.Boolean(compute='_compute_is_validate')
+    employee_ids = fields.Many2many('hr.employee',
+                                    'hr_payslip_run_employee_rel',
+                                    'payslip_run_id', 'employee_id',
+                                    string='Employees', copy=False,
+                                    help="Employees the payslips of this "
+                                         "batch are generated for")
+    generation_progress = fields.Float(
+        compute='_compute_generation_progress', string='Generation Progress',
+        help="Percentage of the selected employees having their payslip "
+             "generated")
+    compute_mode = fields.Selection([
+        ('serial', 'Serial'),
+        ('parallel', 'Parallel'),
+    ], string='Computation Mode', required=True, default='serial',
+        help="Parallel splits the payslips of the batch in shards computed "
+             "by the payroll cron workers, each one in its own process")
+    incremental_compute = fields.Boolean(
+        string='Incremental Recompute',
+        help="Only recompute the payslips whose contract, worked days, "
+             "inputs or salary rules changed since their last computation, "
+             "and only rewrite the lines which changed")
+    profile_rules = fields.Boolean(
+        string='Profile Salary Rules',
+        help="Measure the time and the SQL queries of every salary rule "
+             "while computing the payslips of the batch")
+    rule_stat_ids = fields.One2many('hr.payslip.run.rule.stat', 'run_id',
+                                    string='Rule Profile', readonly=True,
+                                    help="Profile of the salary rules")
+    shard_ids = fields.One2many('hr.payslip.run.shard', 'run_id',
+                                string='Shards', readonly=True,
+                                help="Shards of the parallel computation")
+    pending_employee_count = fields.Integer(
+        compute='_compute_generation_progress', string='Pending Employees',
+        help="Number of selected employees still waiting for their payslip")
+    pdf_output = fields.Selection([
+        ('payslip', 'One PDF per Payslip'),
+        ('department', 'Merged per Department'),
+    ], string='PDF Output', required=True, default='payslip',
+        help="Rendered payslips are stored as attachments of every payslip, "
+             "and can also be merged into one file per department")
+    merged_pdf_ids = fields.Many2many('ir.attachment',
+                                      'hr_payslip_run_merged_pdf_rel',
+                                      'run_id', 'attachment_id',
+                                      string='Merged PDFs', readonly=True,
+                                      copy=False,
+                                      help="Payslip PDFs merged per "
+                                           "department")
+    render_rate = fields.Float(compute='_compute_render_rate',
+                               string='Rendering Throughput',
+                               help="Payslips rendered per second by the "
+                                    "render shards of the batch")
 
     def _compute_is_validate(self):
         for record in self:
@@ -66,11 +130,31 @@ class HrPayslipRun(models.Model):
             else:
                 record.is_validate = False
 
+    @api.depends('employee_ids', 'slip_ids.employee_id')
+    def _compute_generation_progress(self):
+        """Compute how far the generation of the payslips went, from the
+        payslips already committed in the batch"""
+        for record in self:
+            total = len(record.employee_ids)
+            pending = record.employee_ids - record.slip_ids.employee_id
+            record.pending_employee_count = len(pending)
+            record.generation_progress = total and 100.0 * (
+                    total - len(pending)) / total or 0.0
+
+    @api.depends('shard_ids.duration', 'shard_ids.state')
+    def _compute_render_rate(self):
+        """Compute the payslips rendered per second of processing"""
+        for record in self:
+            shards = record.shard_ids.filtered(
+                lambda shard: shard.task == 'render' and shard.state == 'done')
+            duration = sum(shards.mapped('duration'))
+            record.render_rate = duration and sum(
+                shards.mapped('slip_count')) / duration or 0.0
+
     def action_validate_payslips(self):
-        if self.slip_ids:
-            for slip in self.slip_ids.filtered(
-                    lambda slip: slip.state == 'draft'):
-                slip.action_payslip_done()
+        """Function for validating the draft payslips of the batch at once"""
+        self.mapped('slip_ids').filtered(
+            lambda slip: slip.state == 'draft').action_payslip_done()
 
     def action_payslip_run(self):
         """Function for state change"""
@@ -79,3 +163,151 @@ class HrPayslipRun(models.Model):
     def close_payslip_run(self):
         """Function for state change"""
         return self.write({'state': 'close'})
+
+    def action_resume_payslip_generation(self):
+        """Function for generating the payslips of the employees left
+        behind by an interrupted generation"""
+        for record in self:
+            record._generate_payslips(record.employee_ids)
+
+    def action_compute_sheets(self):
+        """Function for computing the draft payslips of the batch"""
+        for record in self:
+            payslips = record.slip_ids.filtered(
+                lambda slip: slip.state == 'draft')
+            if record.profile_rules:
+                record.rule_stat_ids.unlink()
+            if record.compute_mode == 'parallel':
+                record._compute_sheets_parallel(payslips)
+            else:
+                payslips.with_context(
+                    payslip_incremental=record.incremental_compute,
+                    payslip_profile=record.profile_rules,
+                ).action_compute_sheet()
+
+    def _compute_sheets_parallel(self, payslips):
+        """
+        Split the payslips in shards computed by the payroll cron workers.
+        The payslips are numbered from the salary.slip sequence beforehand,
+        ordered by employee, so that the numbering does not depend on the
+        order the workers process the shards in.
+        @param payslips: recordset of hr.payslip of this batch
+        @return: the created shards
+        """
+        self.ensure_one()
+        payslips -= self.shard_ids.filtered(
+            lambda shard: shard.state == 'pending').slip_ids
+        payslips = payslips.sorted(
+            lambda slip: (slip.employee_id.name or '', slip.employee_id.id))
+        for payslip in payslips.filtered(lambda slip: not slip.number):
+            payslip.number = self.env['ir.sequence'].next_by_code(
+                'salary.slip')
+        shard_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_payroll_community.payslip_run_shard_size',
+            PAYSLIP_RUN_SHARD_SIZE))
+        shards = self.env['hr.payslip.run.shard'].create([{
+            'run_id': self.id,
+            'sequence': sequence,
+            'task': 'compute',
+            'slip_ids': [(6, 0, slip_ids)],
+            'slip_count': len(slip_ids),
+        } for sequence, slip_ids in enumerate(
+            split_every(shard_size, payslips.ids, list))])
+        shards._dispatch()
+        return shards
+
+    def action_render_payslips(self):
+        """
+        Render the PDFs of the done payslips of the batch by shards processed
+        by the payroll cron workers. The payslips already rendered or being
+        rendered are skipped, so that the action resumes an interrupted or
+        failed rendering without queuing another merge of the PDFs.
+        @return: the created shards
+        """
+        self.ensure_one()
+        payslips = self.slip_ids.filtered(
+            lambda slip: slip.state == 'done' and not slip.pdf_attachment_id)
+        payslips -= self.shard_ids.filtered(
+            lambda shard: shard.task == 'render' and
+                          shard.state == 'pending').slip_ids
+        payslips = payslips.sorted(
+            lambda slip: (slip.employee_id.department_id.id or 0,
+                          slip.employee_id.name or ''))
+        shard_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_payroll_community.payslip_run_render_shard_size',
+            PAYSLIP_RUN_RENDER_SHARD_SIZE))
+        vals_list = [{
+            'run_id': self.id,
+            'sequence': sequence,
+            'task': 'render',
+            'slip_ids': [(6, 0, slip_ids)],
+            'slip_count': len(slip_ids),
+        } for sequence, slip_ids in enumerate(
+            split_every(shard_size, payslips.ids, list))]
+        # a merge shard is queued only after new render shards, and only if
+        # no merge of the batch is pending or running yet
+        if vals_list and self.pdf_output == 'department' and not \
+                self.shard_ids.filtered(
+                    lambda shard: shard.task == 'merge' and
+                                  shard.state == 'pending'):
+            vals_list.append({
+                'run_id': self.id,
+                'sequence': len(vals_list),
+                'task': 'merge',
+                'slip_count': 0,
+            })
+        shards = self.env['hr.payslip.run.shard'].create(vals_list)
+        shards._dispatch()
+        return shards
+
+    def action_open_rule_stats(self):
+        """Function for opening the profile of the salary rules"""
+        self.ensure_one()
+        return {
+            'name': _('Rule Profile'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'hr.payslip.run.rule.stat',
+            'view_mode': 'tree',
+            'domain': [('run_id', '=', self.id)],
+            'context': {'default_run_id': self.id},
+        }
+
+    def _generate_payslips(self, employees):
+        """
+        Create and compute the payslips of the given employees for this batch
+        by chunks. Each chunk is created with a single create(), its lines are
+        written at once and the chunk is committed, so that an interrupted
+        generation can be resumed: employees already having a payslip in the
+        batch are skipped. In parallel mode the chunks are only created and
+        the payslips without lines are then computed by shards.
+        @param employees: recordset of hr.employee
+        @return: the generated payslips
+        """
+        self.ensure_one()
+        payslip_obj = self.env['hr.payslip']
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_payroll_community.payslip_run_chunk_size',
+            PAYSLIP_RUN_CHUNK_SIZE))
+        employees -= self.slip_ids.employee_id
+        payslip_ids = []
+        done = 0
+        for employee_ids in split_every(chunk_size, employees.ids):
+            chunk = self.env['hr.employee'].browse(employee_ids)
+            payslips = payslip_obj.create(
+                payslip_obj._prepare_payslip_run_values(self, chunk))
+            if self.compute_mode == 'serial':
+                payslips.with_context(
+                    payslip_profile=self.profile_rules).action_compute_sheet()
+            payslip_ids += payslips.ids
+            done += len(chunk)
+            _logger.info("Payslip batch %s: %s/%s payslips generated",
+                         self.name, done, len(employees))
+            if auto_commit:
+                self.env.cr.commit()
+                # keep the memory bounded on large batches
+                self.env.invalidate_all()
+        if self.compute_mode == 'parallel':
+            self._compute_sheets_parallel(self.slip_ids.filtered(
+                lambda slip: slip.state == 'draft' and not slip.line_ids))
+        return payslip_obj.browse(payslip_ids)
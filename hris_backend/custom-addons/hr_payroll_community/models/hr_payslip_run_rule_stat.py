@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import time
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+
+class RuleProfiler(object):
+    """Profiler of the salary rules, measuring the wall time, the number of
+    evaluations and the SQL queries of their conditions and computations.
+    It is only created when the profiling is enabled, the payslips calling
+    the rules directly otherwise."""
+
+    def __init__(self, cr):
+        """Function for getting the cursor the queries are counted on"""
+        self.cr = cr
+        self.run_id = False
+        # {(run_id, rule_id): [condition_count, condition_time,
+        #                      compute_count, compute_time, query_count]}
+        self.stats = defaultdict(lambda: [0, 0.0, 0, 0.0, 0])
+
+    def _call(self, rule, index, method, localdict):
+        """Function for calling and measuring a method of the rule"""
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            return method(localdict)
+        finally:
+            stats = self.stats[self.run_id, rule.id]
+            stats[index] += 1
+            stats[index + 1] += time.perf_counter() - start
+            stats[4] += self.cr.sql_log_count - queries
+
+    def satisfy_condition(self, rule, localdict):
+        """Function for measuring the condition of the rule"""
+        return self._call(rule, 0, rule._satisfy_condition, localdict)
+
+    def compute_rule(self, rule, localdict):
+        """Function for measuring the computation of the rule"""
+        return self._call(rule, 2, rule._compute_rule, localdict)
+
+
+class HrPayslipRunRuleStat(models.Model):
+    """Create new model for the profile of the salary rules computed for the
+    payslips of a batch"""
+    _name = 'hr.payslip.run.rule.stat'
+    _description = 'Payslip Batch Rule Profile'
+    _order = 'total_time desc'
+    _rec_name = 'rule_id'
+
+    run_id = fields.Many2one('hr.payslip.run', string='Payslip Batch',
+                             required=True, ondelete='cascade', index=True,
+                             help="Payslip batch the rules were computed for")
+    rule_id = fields.Many2one('hr.salary.rule', string='Salary Rule',
+                              required=True, ondelete='cascade',
+                              help="Profiled salary rule")
+    code = fields.Char(related='rule_id.code', string='Code',
+                       help="Code of the salary rule")
+    condition_count = fields.Integer(string='Conditions',
+                                     help="Number of condition evaluations")
+    condition_time = fields.Float(string='Condition Time (s)',
+                                 help="Time spent in the conditions")
+    compute_count = fields.Integer(string='Computations',
+                                   help="Number of amount computations")
+    compute_time = fields.Float(string='Computation Time (s)',
+                                help="Time spent in the computations")
+    query_count = fields.Integer(string='SQL Queries',
+                                 help="Number of SQL queries issued by the "
+                                      "rule, e.g. by the payslip.sum helpers")
+    total_time = fields.Float(string='Total Time (s)',
+                              help="Time spent in the rule")
+
+    _sql_constraints = [
+        ('run_rule_unique', 'UNIQUE(run_id, rule_id)',
+         'A salary rule is profiled once per payslip batch.'),
+    ]
+
+    @api.model
+    def _record_profile(self, profiler):
+        """Function for adding the measures of the profiler to the profiles
+        of the batches, the workers of a parallel computation adding their
+        own measures concurrently"""
+        for (run_id, rule_id), stats in profiler.stats.items():
+            if not run_id:
+                continue
+            condition_count, condition_time, compute_count, compute_time, \
+                query_count = stats
+            self._cr.execute("""
+                INSERT INTO hr_payslip_run_rule_stat (run_id, rule_id,
+                    condition_count, condition_time, compute_count,
+                    compute_time, query_count, total_time, create_uid,
+                    create_date, write_uid, write_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s,
+                        NOW() AT TIME ZONE 'UTC', %s,
+                        NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (run_id, rule_id) DO UPDATE SET
+                    condition_count = hr_payslip_run_rule_stat.condition_count
+                        + EXCLUDED.condition_count,
+                    condition_time = hr_payslip_run_rule_stat.condition_time
+                        + EXCLUDED.condition_time,
+                    compute_count = hr_payslip_run_rule_stat.compute_count
+                        + EXCLUDED.compute_count,
+                    compute_time = hr_payslip_run_rule_stat.compute_time
+                        + EXCLUDED.compute_time,
+                    query_count = hr_payslip_run_rule_stat.query_count
+                        + EXCLUDED.query_count,
+                    total_time = hr_payslip_run_rule_stat.total_time
+                        + EXCLUDED.total_time,
+                    write_date = EXCLUDED.write_date""",
+                (run_id, rule_id, condition_count, condition_time,
+                 compute_count, compute_time, query_count,
+                 condition_time + compute_time, self.env.uid, self.env.uid))
+        self.invalidate_model()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from odoo import fields, models, _
+from odoo.tools.pdf import merge_pdf
+
+_logger = logging.getLogger(__name__)
+
+
+class HrPayslipRunShard(models.Model):
+    """Create new model for the shards of a payslip batch, processed in
+    parallel by the payroll cron workers"""
+    _name = 'hr.payslip.run.shard'
+    _description = 'Payslip Batch Shard'
+    _order = 'run_id, sequence, id'
+
+    run_id = fields.Many2one('hr.payslip.run', string='Payslip Batch',
+                             required=True, ondelete='cascade', index=True,
+                             help="Payslip batch the shard belongs to")
+    sequence = fields.Integer(string='Sequence', default=10,
+                              help="Processing order of the shard")
+    task = fields.Selection([
+        ('compute', 'Compute Payslips'),
+        ('render', 'Render Payslip PDFs'),
+        ('merge', 'Merge Payslip PDFs'),
+    ], string='Task', required=True, default='compute',
+        help="Work done on the payslips of the shard")
+    slip_ids = fields.Many2many('hr.payslip', 'hr_payslip_run_shard_slip_rel',
+                                'shard_id', 'slip_id', string='Payslips',
+                                help="Payslips processed by the shard")
+    slip_count = fields.Integer(string='Payslip Count',
+                                help="Number of payslips of the shard")
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', required=True, default='pending', index=True,
+        help="Processing status of the shard")
+    error = fields.Text(string='Error', readonly=True,
+                        help="Error raised while processing the shard")
+    duration = fields.Float(string='Duration (s)', readonly=True,
+                            help="Time spent processing the shard")
+
+    def _dispatch(self):
+        """Wake up the payroll cron workers so that every one of them
+        processes pending shards in its own process and cursor. In test mode
+        the shards are processed right away."""
+        if getattr(threading.current_thread(), 'testing', False):
+            for shard in self:
+                shard._process()
+            return
+        for cron in self.env['ir.cron'].sudo().search(
+                [('model_id.model', '=', self._name)]):
+            cron._trigger()
+
+    def _acquire_pending(self):
+        """Lock the next pending shard, skipping the ones already taken by
+        another worker. The merge shards wait for the render shards of their
+        batch, which stay pending until their worker commits."""
+        self.env.cr.execute("""
+            SELECT sh.id FROM hr_payslip_run_shard AS sh
+            WHERE sh.state = 'pending'
+            AND (sh.task != 'merge' OR NOT EXISTS (
+                SELECT 1 FROM hr_payslip_run_shard AS render
+                WHERE render.run_id = sh.run_id
+                AND render.task = 'render' AND render.state = 'pending'))
+            ORDER BY sh.run_id, sh.sequence, sh.id
+            LIMIT 1
+            FOR UPDATE OF sh SKIP LOCKED""")
+        row = self.env.cr.fetchone()
+        return self.browse(row and row[0])
+
+    def _process_shards(self):
+        """Cron entry point: process pending shards until none is left, one
+        transaction per shard. A shard interrupted by a dead worker is
+        rolled back to pending and taken again by the next worker."""
+        while True:
+            shard = self._acquire_pending()
+            if not shard:
+                break
+            try:
+                with self.env.cr.savepoint():
+                    shard._process()
+            except Exception as e:
+                _logger.exception("Payslip batch %s: shard %s failed",
+                                  shard.run_id.name, shard.id)
+                shard.write({'state': 'failed', 'error': str(e)})
+            self.env.cr.commit()
+            self.env.invalidate_all()
+
+    def _process(self):
+        """Run the task of the shard on its payslips"""
+        self.ensure_one()
+        start = time.perf_counter()
+        getattr(self, '_process_%s' % self.task)()
+        duration = time.perf_counter() - start
+        self.write({'state': 'done', 'error': False, 'duration': duration})
+        _logger.info("Payslip batch %s: %s shard %s (%s payslips) done in "
+                     "%.2fs (%.1f payslips/s)", self.run_id.name, self.task,
+                     self.sequence, self.slip_count, duration,
+                     duration and self.slip_count / duration or 0.0)
+
+    def _process_compute(self):
+        """Compute the payslips of the shard"""
+        self.slip_ids.with_context(
+            payslip_incremental=self.run_id.incremental_compute,
+            payslip_profile=self.run_id.profile_rules,
+        ).action_compute_sheet()
+
+    def _process_render(self):
+        """Render the PDFs of the payslips of the shard and store them as
+        attachments. The payslips are rendered by a single report call, so
+        that the compiled templates and the assets are shared by the whole
+        shard, and the resulting PDF is split per payslip. The payslips
+        already rendered by a previous attempt are skipped."""
+        payslips = self.slip_ids.filtered(
+            lambda slip: not slip.pdf_attachment_id)
+        if not payslips:
+            return
+        report = self.env.ref(
+            'hr_payroll_community.hr_payslip_new_report_action')
+        report_obj = self.env['ir.actions.report']
+        streams = report_obj._render_qweb_pdf_prepare_streams(
+            report.report_name, {'report_type': 'pdf'}, res_ids=payslips.ids)
+        contents = {}
+        if False in streams:
+            # the rendered document could not be split per payslip
+            for stream in streams.values():
+                stream['stream'].close()
+            for payslip in payslips:
+                contents[payslip.id] = report_obj._render_qweb_pdf(
+                    report.report_name, [payslip.id])[0]
+        else:
+            for payslip_id, stream in streams.items():
+                contents[payslip_id] = stream['stream'].getvalue()
+                stream['stream'].close()
+        attachments = self.env['ir.attachment'].create([{
+            'name': _('Payslip - %s.pdf') % (
+                    payslip.number or payslip.employee_id.name),
+            'type': 'binary',
+            'raw': contents[payslip.id],
+            'mimetype': 'application/pdf',
+            'res_model': 'hr.payslip',
+            'res_id': payslip.id,
+        } for payslip in payslips])
+        for payslip, attachment in zip(payslips, attachments):
+            payslip.pdf_attachment_id = attachment
+
+    def _process_merge(self):
+        """Merge the rendered PDFs of the payslips of the batch into one
+        file per department"""
+        run = self.run_id
+        payslips_by_department = defaultdict(list)
+        for payslip in run.slip_ids.filtered('pdf_attachment_id'):
+            payslips_by_department[payslip.employee_id.department_id].append(
+                payslip)
+        merged_pdfs = self.env['ir.attachment']
+        for department, payslips in payslips_by_department.items():
+            merged_pdfs |= self.env['ir.attachment'].create({
+                'name': '%s - %s.pdf' % (
+                    run.name, department.name or _('No Department')),
+                'type': 'binary',
+                'raw': merge_pdf([payslip.pdf_attachment_id.raw
+                                  for payslip in payslips]),
+                'mimetype': 'application/pdf',
+                'res_model': 'hr.payslip.run',
+                'res_id': run.id,
+            })
+        run.merged_pdf_ids.unlink()
+        run.merged_pdf_ids = [(6, 0, merged_pdfs.ids)]
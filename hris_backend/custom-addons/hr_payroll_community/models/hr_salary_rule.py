@@ -20,12 +20,24 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools.safe_eval import safe_eval
+from odoo.tools.safe_eval import (_BUILTINS, _SAFE_OPCODES, check_values,
+                                  test_expr, unsafe_eval)
 
 from odoo.addons import decimal_precision as dp
 
+# Expressions evaluated in 'exec' mode, they have to set `result`
+EXEC_EXPRESSION_FIELDS = ('condition_python', 'amount_python_compute')
+# Expressions evaluated in 'eval' mode, they return the value directly
+EVAL_EXPRESSION_FIELDS = ('condition_range', 'quantity',
+                          'amount_percentage_base')
+# Fields the cached rule plans of the structures are built from
+RULE_PLAN_FIELDS = ('sequence', 'parent_rule_id', 'child_ids', 'active',
+                    'code', 'category_id', 'condition_select',
+                    'condition_range_min', 'condition_range_max',
+                    'amount_select')
+
 
 class HrSalaryRule(models.Model):
     """Create new model for Salary Rule"""
@@ -169,6 +181,74 @@ class HrSalaryRule(models.Model):
             children_rules += rule.child_ids._recursive_search_of_rules()
         return [(rule.id, rule.sequence) for rule in self] + children_rules
 
+    @tools.ormcache('self.id')
+    def _get_recursive_rule_ids(self):
+        """
+        @return: the ids of the rule and of all its children, cached until
+        the rules change
+        """
+        return frozenset(id for id, sequence in
+                         self._recursive_search_of_rules())
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Function to clear the rule caches when rules are created"""
+        res = super(HrSalaryRule, self).create(vals_list)
+        res._invalidate_rule_caches(RULE_PLAN_FIELDS)
+        return res
+
+    def write(self, vals):
+        """Function to clear the rule caches when rules are edited"""
+        res = super(HrSalaryRule, self).write(vals)
+        self._invalidate_rule_caches(vals)
+        return res
+
+    def unlink(self):
+        """Function to clear the rule caches when rules are deleted"""
+        res = super(HrSalaryRule, self).unlink()
+        self._invalidate_rule_caches(RULE_PLAN_FIELDS)
+        return res
+
+    def _invalidate_rule_caches(self, fnames):
+        """
+        Drop the compiled expressions and the rule plans in every worker when
+        one of the fields they are built from changes. hr.payslip.line
+        inherits these methods but never feeds the caches.
+        @param fnames: names of the modified fields
+        """
+        if self._name == 'hr.salary.rule' and not set(fnames).isdisjoint(
+                EXEC_EXPRESSION_FIELDS + EVAL_EXPRESSION_FIELDS +
+                RULE_PLAN_FIELDS):
+            self.env.registry.clear_cache()
+
+    @tools.ormcache('self.id', 'self.write_date', 'fname')
+    def _get_compiled_expression(self, fname):
+        """
+        @param fname: name of the field holding the expression
+        @return: the code object of the expression, checked against the
+        opcodes allowed by safe_eval. It is compiled once per rule version
+        (id and write_date) and kept in the registry cache.
+        """
+        mode = 'exec' if fname in EXEC_EXPRESSION_FIELDS else 'eval'
+        return test_expr(self[fname] or '', _SAFE_OPCODES, mode=mode,
+                         filename='%s(%s).%s' % (self._name, self.id, fname))
+
+    def _eval_expression(self, fname, localdict):
+        """
+        Evaluate the compiled expression of `fname` in the same sandbox as
+        safe_eval: the values are checked, only the safe builtins are
+        available, and 'eval' expressions work on a copy of the localdict
+        while 'exec' ones update it in place (nocopy).
+        """
+        code = self._get_compiled_expression(fname)
+        if fname in EXEC_EXPRESSION_FIELDS:
+            globals_dict = localdict
+        else:
+            globals_dict = dict(localdict)
+        check_values(globals_dict)
+        globals_dict['__builtins__'] = dict(_BUILTINS)
+        return unsafe_eval(code, globals_dict)
+
     # TODO should add some checks on the type of result (should be float)
     def _compute_rule(self, localdict):
         """
@@ -181,7 +261,7 @@ class HrSalaryRule(models.Model):
             if rec.amount_select == 'fix':
                 try:
                     return rec.amount_fix, float(
-                        safe_eval(rec.quantity, localdict)), 100.0
+                        rec._eval_expression('quantity', localdict)), 100.0
                 except:
                     raise UserError(
                         _('Wrong quantity defined for salary rule %s (%s).') % (
@@ -189,8 +269,9 @@ class HrSalaryRule(models.Model):
             elif rec.amount_select == 'percentage':
                 try:
                     return (
-                        float(safe_eval(rec.amount_percentage_base, localdict)),
-                        float(safe_eval(rec.quantity, localdict)),
+                        float(rec._eval_expression('amount_percentage_base',
+                                                   localdict)),
+                        float(rec._eval_expression('quantity', localdict)),
                         rec.amount_percentage)
                 except:
                     raise UserError(
@@ -199,8 +280,7 @@ class HrSalaryRule(models.Model):
                             rec.name, rec.code))
             else:
                 try:
-                    safe_eval(rec.amount_python_compute, localdict, mode='exec',
-                              nocopy=True)
+                    rec._eval_expression('amount_python_compute', localdict)
                     return (float(localdict['result']),
                             'result_qty' in localdict and
                             localdict['result_qty'] or 1.0, 'result_rate'
@@ -222,7 +302,7 @@ class HrSalaryRule(models.Model):
             return True
         elif self.condition_select == 'range':
             try:
-                result = safe_eval(self.condition_range, localdict)
+                result = self._eval_expression('condition_range', localdict)
                 return (self.condition_range_min <= result and result <=
                         self.condition_range_max or False)
             except:
@@ -232,8 +312,7 @@ class HrSalaryRule(models.Model):
                         self.name, self.code))
         else:  # python code
             try:
-                safe_eval(self.condition_python, localdict, mode='exec',
-                          nocopy=True)
+                self._eval_expression('condition_python', localdict)
                 return 'result' in localdict and localdict['result'] or False
             except:
                 raise UserError(
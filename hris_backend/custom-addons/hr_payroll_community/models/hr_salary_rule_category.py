@@ -47,6 +47,30 @@ class HrSalaryRuleCategory(models.Model):
         'res.company', string='Company', help="Choose Company",
         default=lambda self: self.env['res.company']._company_default_get())
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Function to add the new categories to the category closure"""
+        res = super(HrSalaryRuleCategory, self).create(vals_list)
+        self.env['hr.salary.rule.category.closure']._rebuild()
+        return res
+
+    def write(self, vals):
+        """Function to clear the rule plans and rebuild the category closure
+        when the hierarchy of the categories changes"""
+        res = super(HrSalaryRuleCategory, self).write(vals)
+        if 'parent_id' in vals or 'code' in vals:
+            self.env.registry.clear_cache()
+        if 'parent_id' in vals:
+            self.env['hr.salary.rule.category.closure']._rebuild()
+        return res
+
+    def unlink(self):
+        """Function to rebuild the category closure of the children of the
+        removed categories"""
+        res = super(HrSalaryRuleCategory, self).unlink()
+        self.env['hr.salary.rule.category.closure']._rebuild()
+        return res
+
     @api.constrains('parent_id')
     def _check_parent_id(self):
         """Function to add constrains for parent_id field"""
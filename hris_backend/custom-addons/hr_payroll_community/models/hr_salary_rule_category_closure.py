@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from odoo import api, fields, models
+
+
+class HrSalaryRuleCategoryClosure(models.Model):
+    """Create new model for the ancestors of the Salary Rule Categories,
+    one row for every category and each of its ancestors including itself,
+    so that the reports do not have to walk the parents of the categories"""
+    _name = 'hr.salary.rule.category.closure'
+    _description = 'Salary Rule Category Closure'
+    _log_access = False
+    _order = 'descendant_id, depth'
+
+    ancestor_id = fields.Many2one('hr.salary.rule.category',
+                                  string='Ancestor', required=True,
+                                  readonly=True, index=True,
+                                  ondelete='cascade',
+                                  help="Category itself or one of its parents")
+    descendant_id = fields.Many2one('hr.salary.rule.category',
+                                    string='Category', required=True,
+                                    readonly=True, ondelete='cascade',
+                                    help="Category the ancestor belongs to")
+    depth = fields.Integer(string='Depth', readonly=True,
+                           help="Number of parents between the category and "
+                                "the ancestor, 0 for the category itself")
+
+    _sql_constraints = [
+        ('descendant_ancestor_uniq', 'unique(descendant_id, ancestor_id)',
+         'A category can only have an ancestor once.'),
+    ]
+
+    def init(self):
+        """Function for building the closure of the existing categories"""
+        self._rebuild()
+
+    @api.model
+    def _rebuild(self):
+        """Function for rebuilding the closure from the parents of the
+        categories. The categories are few, so the whole closure is
+        recomputed in a single query whenever their hierarchy changes."""
+        self.env['hr.salary.rule.category'].flush_model(['parent_id'])
+        self.env.cr.execute("""
+            DELETE FROM hr_salary_rule_category_closure;
+            WITH RECURSIVE closure(descendant_id, ancestor_id, depth) AS (
+                SELECT id, id, 0 FROM hr_salary_rule_category
+                UNION ALL
+                SELECT cl.descendant_id, rc.parent_id, cl.depth + 1
+                FROM closure AS cl
+                JOIN hr_salary_rule_category AS rc
+                    ON (rc.id = cl.ancestor_id)
+                WHERE rc.parent_id IS NOT NULL
+            )
+            INSERT INTO hr_salary_rule_category_closure
+                (descendant_id, ancestor_id, depth)
+            SELECT descendant_id, ancestor_id, depth FROM closure""")
+        self.invalidate_model()
+
+    @api.model
+    def _get_ancestors(self, category_ids):
+        """Function for getting the ancestors of categories
+        @param category_ids: ids of the categories
+        @return: {category_id: [ancestor ids, from the category itself up to
+        its root category]}"""
+        ancestors = {}
+        if not category_ids:
+            return ancestors
+        self.env.cr.execute("""
+            SELECT descendant_id, ancestor_id
+            FROM hr_salary_rule_category_closure
+            WHERE descendant_id IN %s
+            ORDER BY descendant_id, depth""", (tuple(category_ids),))
+        for descendant_id, ancestor_id in self.env.cr.fetchall():
+            ancestors.setdefault(descendant_id, []).append(ancestor_id)
+        return ancestors
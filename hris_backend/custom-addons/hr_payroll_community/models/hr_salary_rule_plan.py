@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import ast
+from collections import namedtuple
+
+from odoo.tools.safe_eval import _BUILTINS
+
+# Objects of the localdict giving access to the payslip data by attribute
+RULE_OBJECTS = ('categories', 'rules', 'inputs', 'worked_days')
+# Names of the localdict which are not rule codes
+LOCAL_NAMES = frozenset(RULE_OBJECTS + (
+    'payslip', 'employee', 'contract', 'result', 'result_qty',
+    'result_rate')) | frozenset(_BUILTINS)
+# Attributes of the localdict objects which are not codes
+HELPER_ATTRIBUTES = ('sum', '_sum', 'sum_hours', 'employee_id', 'env')
+
+# Compiled plan of the rules of a set of structures:
+# - rule_ids: rules which may fire, in evaluation order
+# - levels: groups of rules, each one only depending on the previous groups
+# - dependencies: (rule id, ids of the previous rules it depends on)
+# - always_true: rules whose condition is always satisfied
+# - dropped_rule_ids: rules which can never fire
+RulePlan = namedtuple('RulePlan', ['rule_ids', 'levels', 'dependencies',
+                                   'always_true', 'dropped_rule_ids'])
+# Payslip data read by the expressions of a rule. Opaque rules read the
+# localdict in a way the analysis cannot follow.
+RuleReads = namedtuple('RuleReads', ['codes', 'categories', 'inputs',
+                                     'worked_days', 'opaque'])
+
+
+def get_expression_reads(expression, mode):
+    """
+    @param expression: python expression or code of a salary rule
+    @param mode: 'eval' or 'exec'
+    @return: RuleReads with the rule codes, categories, inputs and worked
+    days the expression reads
+    """
+    reads = {name: set() for name in RULE_OBJECTS}
+    try:
+        tree = ast.parse((expression or '').strip() or 'None', mode=mode)
+    except SyntaxError:
+        return RuleReads(frozenset(), frozenset(), frozenset(), frozenset(),
+                         True)
+    opaque = False
+    assigned = set()
+    attribute_names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            assigned.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(
+                node.value, ast.Name) and node.value.id in reads:
+            attribute_names.add(node.value)
+            if node.attr == 'dict':
+                opaque = True
+            elif node.attr not in HELPER_ATTRIBUTES:
+                reads[node.value.id].add(node.attr)
+    codes = reads['rules']
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Name) or not isinstance(node.ctx,
+                                                             ast.Load):
+            continue
+        if node.id in reads:
+            # the object itself is used, not one of its attributes
+            if node not in attribute_names:
+                opaque = True
+        elif node.id not in LOCAL_NAMES and node.id not in assigned:
+            codes.add(node.id)
+    return RuleReads(frozenset(codes), frozenset(reads['categories']),
+                     frozenset(reads['inputs']),
+                     frozenset(reads['worked_days']), opaque)
+
+
+def get_rule_reads(rule):
+    """
+    @param rule: hr.salary.rule
+    @return: RuleReads of all the expressions the rule evaluates
+    """
+    expressions = []
+    if rule.condition_select == 'range':
+        expressions.append((rule.condition_range, 'eval'))
+    elif rule.condition_select == 'python':
+        expressions.append((rule.condition_python, 'exec'))
+    if rule.amount_select == 'fix':
+        expressions.append((rule.quantity, 'eval'))
+    elif rule.amount_select == 'percentage':
+        expressions += [(rule.amount_percentage_base, 'eval'),
+                        (rule.quantity, 'eval')]
+    else:
+        expressions.append((rule.amount_python_compute, 'exec'))
+    all_reads = [get_expression_reads(expression, mode)
+                 for expression, mode in expressions]
+    return RuleReads(*(
+        frozenset().union(*(reads[index] for reads in all_reads))
+        for index in range(4)), any(reads.opaque for reads in all_reads))
+
+
+def get_constant_condition(rule):
+    """
+    @param rule: hr.salary.rule
+    @return: True or False when the condition of the rule does not depend on
+    the payslip, None otherwise
+    """
+    if rule.condition_select == 'none':
+        return True
+    if rule.condition_select == 'range':
+        try:
+            value = ast.literal_eval((rule.condition_range or '').strip())
+        except (ValueError, SyntaxError):
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return rule.condition_range_min <= value <= rule.condition_range_max
+    try:
+        tree = ast.parse(rule.condition_python or '', mode='exec')
+    except SyntaxError:
+        return None
+    if len(tree.body) == 1 and isinstance(tree.body[0], ast.Assign) and \
+            len(tree.body[0].targets) == 1 and \
+            isinstance(tree.body[0].targets[0], ast.Name) and \
+            tree.body[0].targets[0].id == 'result' and \
+            isinstance(tree.body[0].value, ast.Constant):
+        return bool(tree.body[0].value.value)
+    return None
+
+
+def get_category_codes(category):
+    """Function for getting the codes of a category and of its parents,
+    which a rule of the category sums its amount into"""
+    codes = set()
+    while category:
+        codes.add(category.code)
+        category = category.parent_id
+    return frozenset(codes)
+
+
+def compile_rule_plan(rules):
+    """
+    @param rules: recordset of hr.salary.rule ordered by sequence, as
+    evaluated by the payslips
+    @return: the RulePlan of the rules. The rules which can never fire
+    (constant false condition, or child of such a rule evaluated after it)
+    are dropped, and the others are split in levels of rules which neither
+    read nor write what another rule of the same level writes.
+    """
+    dropped = set()
+    always_true = set()
+    kept = []
+    for rule in rules:
+        if rule.id in dropped:
+            continue
+        constant = get_constant_condition(rule)
+        if constant is False:
+            # a failed condition blacklists the rule and its children
+            dropped |= rule._get_recursive_rule_ids()
+            continue
+        if constant:
+            always_true.add(rule.id)
+        kept.append(rule)
+    infos = [(rule, get_rule_reads(rule),
+              get_category_codes(rule.category_id),
+              rule._get_recursive_rule_ids()) for rule in kept]
+    levels = {}
+    dependencies = []
+    for index, (rule, reads, categories, children) in enumerate(infos):
+        depends_on = []
+        for previous, previous_reads, previous_categories, \
+                previous_children in infos[:index]:
+            if reads.opaque or previous_reads.opaque or \
+                    rule.code == previous.code or \
+                    previous.code in reads.codes or \
+                    rule.code in previous_reads.codes or \
+                    not categories.isdisjoint(previous_reads.categories) or \
+                    not previous_categories.isdisjoint(reads.categories) or \
+                    rule.id in previous_children:
+                depends_on.append(previous.id)
+        levels[rule.id] = max(
+            (levels[rule_id] + 1 for rule_id in depends_on), default=0)
+        dependencies.append((rule.id, frozenset(depends_on)))
+    level_count = max(levels.values(), default=-1) + 1
+    return RulePlan(
+        rule_ids=tuple(rule.id for rule in kept),
+        levels=tuple(tuple(rule.id for rule in kept
+                           if levels[rule.id] == level)
+                     for level in range(level_count)),
+        dependencies=tuple(dependencies),
+        always_true=frozenset(always_true),
+        dropped_rule_ids=frozenset(rule.id for rule in rules
+                                   if rule.id in dropped),
+    )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import hashlib
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Definition of the salary rules kept by their versions instead of being
+# copied on every payslip line
+RULE_VERSION_FIELDS = (
+    'condition_select', 'condition_python', 'condition_range',
+    'condition_range_min', 'condition_range_max', 'amount_select',
+    'amount_fix', 'amount_percentage', 'amount_python_compute',
+    'amount_percentage_base',
+)
+
+
+class HrSalaryRuleVersion(models.Model):
+    """Create new model for the immutable versions of the salary rules,
+    referenced by the payslip lines computed from them"""
+    _name = 'hr.salary.rule.version'
+    _description = 'Salary Rule Version'
+    _order = 'rule_id, id desc'
+    _rec_name = 'rule_id'
+
+    rule_id = fields.Many2one('hr.salary.rule', string='Salary Rule',
+                              required=True, ondelete='cascade', index=True,
+                              help="Salary rule the version is a snapshot of")
+    version_hash = fields.Char(string='Version Hash', required=True,
+                               help="Hash of the definition of the rule")
+    condition_select = fields.Selection([
+        ('none', 'Always True'),
+        ('range', 'Range'),
+        ('python', 'Python Expression')
+    ], string="Condition Based on", help="Condition for Salary Rule")
+    condition_python = fields.Text(string='Python Condition',
+                                   help='Condition of the salary rule')
+    condition_range = fields.Char(string='Range Based on',
+                                  help='Range of the salary rule')
+    condition_range_min = fields.Float(string='Minimum Range',
+                                       help="Minimum amount of the range")
+    condition_range_max = fields.Float(string='Maximum Range',
+                                       help="Maximum amount of the range")
+    amount_select = fields.Selection([
+        ('percentage', 'Percentage (%)'),
+        ('fix', 'Fixed Amount'),
+        ('code', 'Python Code'),
+    ], string='Amount Type', help="Computation of the salary rule")
+    amount_fix = fields.Float(string='Fixed Amount',
+                              help="Fixed amount of the salary rule")
+    amount_percentage = fields.Float(string='Percentage (%)',
+                                     help="Percentage of the salary rule")
+    amount_python_compute = fields.Text(string='Python Code',
+                                        help="Code of the salary rule")
+    amount_percentage_base = fields.Char(string='Percentage based on',
+                                         help="Base of the percentage")
+
+    _sql_constraints = [
+        ('rule_hash_unique', 'UNIQUE(rule_id, version_hash)',
+         'A salary rule cannot have two identical versions.'),
+    ]
+
+    def init(self):
+        """Function for moving the definitions of the salary rules copied
+        on the payslip lines computed before the versions existed into
+        versions, and dropping the copies once every line references its
+        version. The versions are hashed like the current definitions of
+        the rules, so that the computations reuse them."""
+        self._cr.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'hr_payslip_line'
+            AND column_name = 'amount_python_compute'""")
+        if not self._cr.fetchone():
+            return
+        rule_model = self.env['hr.salary.rule']
+        # NULL safe key of the definition copied on a line
+        line_key = "md5(%s)" % ' || '.join(
+            "md5(COALESCE('v' || l.%s::text, 'n'))" % column
+            for column in RULE_VERSION_FIELDS)
+        self._cr.execute("""
+            SELECT DISTINCT l.salary_rule_id, {line_key}, {line_columns}
+            FROM hr_payslip_line l
+            WHERE l.rule_version_id IS NULL
+            AND l.salary_rule_id IS NOT NULL""".format(
+            line_key=line_key,
+            line_columns=', '.join('l.%s' % column
+                                   for column in RULE_VERSION_FIELDS)))
+        definitions = {}
+        rule_ids, line_keys, version_hashes = [], [], []
+        for row in self._cr.fetchall():
+            values = tuple(
+                rule_model._fields[fname].convert_to_record(
+                    rule_model._fields[fname].convert_to_cache(
+                        value, rule_model, validate=False), rule_model)
+                for fname, value in zip(RULE_VERSION_FIELDS, row[2:]))
+            version_hash = self._hash_definition(values)
+            definitions.setdefault((row[0], version_hash), values)
+            rule_ids.append(row[0])
+            line_keys.append(row[1])
+            version_hashes.append(version_hash)
+        self._insert_versions(definitions)
+        self._cr.execute("""
+            UPDATE hr_payslip_line l SET rule_version_id = v.id
+            FROM UNNEST(%s::int[], %s::varchar[], %s::varchar[])
+                AS m(rule_id, line_key, version_hash)
+            JOIN hr_salary_rule_version v ON v.rule_id = m.rule_id
+                AND v.version_hash = m.version_hash
+            WHERE l.rule_version_id IS NULL
+            AND l.salary_rule_id = m.rule_id
+            AND {line_key} = m.line_key""".format(line_key=line_key),
+                         (rule_ids, line_keys, version_hashes))
+        self._cr.execute("""
+            SELECT COUNT(*) FROM hr_payslip_line
+            WHERE rule_version_id IS NULL""")
+        missing = self._cr.fetchone()[0]
+        # the copies no longer stored by the lines
+        columns = [column for column in RULE_VERSION_FIELDS
+                   if column not in ('condition_select', 'amount_select')]
+        if missing:
+            _logger.warning("%s payslip lines have no salary rule version, "
+                            "their copy of the rule definitions is kept",
+                            missing)
+            # the new lines leave the copies empty
+            self._cr.execute("ALTER TABLE hr_payslip_line %s" % ', '.join(
+                'ALTER COLUMN %s DROP NOT NULL' % column
+                for column in columns))
+            return
+        self._cr.execute("ALTER TABLE hr_payslip_line %s" % ', '.join(
+            'DROP COLUMN %s' % column for column in columns))
+
+    def write(self, vals):
+        """Function for preventing the modification of the versions"""
+        raise UserError(_('The versions of the salary rules cannot be '
+                          'modified.'))
+
+    @api.model
+    def _hash_definition(self, values):
+        """Function for getting the hash of the values of the
+        RULE_VERSION_FIELDS of a rule"""
+        return hashlib.sha256(repr(tuple(values)).encode()).hexdigest()
+
+    @api.model
+    def _get_version_hash(self, rule):
+        """Function for getting the hash of the definition of a rule"""
+        return self._hash_definition(
+            rule[fname] for fname in RULE_VERSION_FIELDS)
+
+    @api.model
+    def _insert_versions(self, definitions):
+        """Function for inserting versions with one multi-row query per
+        chunk, skipping the ones created concurrently
+        @param definitions: dict {(rule_id, hash): values of the
+        RULE_VERSION_FIELDS}"""
+        rule_model = self.env['hr.salary.rule']
+        row = "(%s, NOW() AT TIME ZONE 'UTC', %%s, " \
+              "NOW() AT TIME ZONE 'UTC')" % ', '.join(
+                  ['%s'] * (len(RULE_VERSION_FIELDS) + 3))
+        for chunk in split_every(1000, definitions.items()):
+            params = []
+            for (rule_id, version_hash), values in chunk:
+                params.extend([rule_id, version_hash])
+                params.extend(
+                    rule_model._fields[fname].convert_to_column(
+                        value, rule_model)
+                    for fname, value in zip(RULE_VERSION_FIELDS, values))
+                params.extend([self.env.uid, self.env.uid])
+            self._cr.execute("""
+                INSERT INTO hr_salary_rule_version (rule_id, version_hash,
+                    {columns}, create_uid, create_date, write_uid, write_date)
+                VALUES {rows}
+                ON CONFLICT (rule_id, version_hash) DO NOTHING""".format(
+                columns=', '.join(RULE_VERSION_FIELDS),
+                rows=', '.join([row] * len(chunk))), params)
+
+    @api.model
+    def _get_versions(self, rules):
+        """
+        @param rules: recordset of hr.salary.rule
+        @return: a dict {rule_id: version} with the version matching the
+        current definition of each rule, the missing ones being created
+        """
+        hashes = {rule.id: self._get_version_hash(rule) for rule in rules}
+        versions = self._search_versions(hashes)
+        missing = rules.filtered(lambda rule: rule.id not in versions)
+        if missing:
+            # concurrent computations may create the same versions
+            self._insert_versions({
+                (rule.id, hashes[rule.id]): tuple(
+                    rule[fname] for fname in RULE_VERSION_FIELDS)
+                for rule in missing})
+            versions.update(self._search_versions(
+                {rule.id: hashes[rule.id] for rule in missing}))
+        return versions
+
+    @api.model
+    def _search_versions(self, hashes):
+        """Function for getting the versions of the rules matching the given
+        dict {rule_id: hash}"""
+        versions = {}
+        for version in self.search([
+                ('rule_id', 'in', list(hashes)),
+                ('version_hash', 'in', list(set(hashes.values())))]):
+            if hashes[version.rule_id.id] == version.version_hash:
+                versions[version.rule_id.id] = version
+        return versions
@@ -35,3 +35,8 @@ class ResConfigSettings(models.TransientModel):
                                                help="Is Belgium Payroll")
     module_l10n_in_hr_payroll = fields.Boolean(string='Indian Payroll',
                                                help="Is Indian Payroll")
+    payslip_archive_horizon = fields.Integer(
+        string='Archive Payslips After (Months)',
+        config_parameter='hr_payroll_community.payslip_archive_horizon',
+        help="Done payslips ending this number of months ago have their "
+             "lines moved to the archive tables, 0 keeps every payslip")
@@ -32,6 +32,14 @@ from odoo.tools import float_utils
 ROUNDING_FACTOR = 16
 
 
+def hours_per_day(intervals):
+    """Function for getting the total hours of the intervals per day"""
+    day_hours = defaultdict(float)
+    for start, stop, meta in intervals:
+        day_hours[start.date()] += (stop - start).total_seconds() / 3600
+    return day_hours
+
+
 class ResourceMixin(models.AbstractModel):
     """Inherit resource_mixin for getting Worked Days"""
     _inherit = "resource.mixin"
@@ -48,8 +56,30 @@ class ResourceMixin(models.AbstractModel):
             Returns a dict {'days': n, 'hours': h} containing the
             quantity of working time expressed as days and as hours.
         """
-        resource = self.resource_id
-        calendar = calendar or self.resource_calendar_id
+        return self._get_work_days_data_batch(
+            from_datetime, to_datetime, compute_leaves=compute_leaves,
+            calendar=calendar, domain=domain)[self.id]
+
+    def _get_records_by_calendar(self, calendar=None):
+        """
+            Returns a dict {calendar: records} grouping the records by
+            the given calendar, or else by their own calendar.
+        """
+        records_by_calendar = defaultdict(lambda: self.browse())
+        for record in self:
+            records_by_calendar[calendar or record.resource_calendar_id] \
+                |= record
+        return records_by_calendar
+
+    def _get_work_days_data_batch(self, from_datetime, to_datetime,
+                                  compute_leaves=True, calendar=None,
+                                  domain=None):
+        """
+            Batch version of `get_work_days_data`: the intervals are built
+            once per calendar for the resources of all the records.
+
+            Returns a dict {id: {'days': n, 'hours': h}}.
+        """
         # naive datetimes are made explicit in UTC
         if not from_datetime.tzinfo:
             from_datetime = from_datetime.replace(tzinfo=utc)
@@ -59,30 +89,62 @@ class ResourceMixin(models.AbstractModel):
         # in order to compute the total hours on the first and last days
         from_full = from_datetime - timedelta(days=1)
         to_full = to_datetime + timedelta(days=1)
-        intervals = calendar._attendance_intervals_batch(from_full, to_full,
-                                                         resource)
-        day_total = defaultdict(float)
-        for start, stop, meta in intervals[resource.id]:
-            day_total[start.date()] += (stop - start).total_seconds() / 3600
-        # actual hours per day
-        if compute_leaves:
-            intervals = calendar._work_intervals_batch(from_datetime,
-                                                       to_datetime, resource,
-                                                       domain)
-        else:
-            intervals = calendar._attendance_intervals_batch(from_datetime,
-                                                             to_datetime,
-                                                             resource)
-        day_hours = defaultdict(float)
-        for start, stop, meta in intervals[resource.id]:
-            day_hours[start.date()] += (stop - start).total_seconds() / 3600
-        # compute number of days as quarters
-        days = sum(
-            float_utils.round(ROUNDING_FACTOR * day_hours[day] / day_total[
-                day]) / ROUNDING_FACTOR
-            for day in day_hours
-        )
-        return {
-            'days': days,
-            'hours': sum(day_hours.values()),
-        }
+        result = {}
+        for calendar, records in self._get_records_by_calendar(
+                calendar).items():
+            resources = records.mapped('resource_id')
+            total_intervals = calendar._attendance_intervals_batch(
+                from_full, to_full, resources)
+            # actual hours per day
+            if compute_leaves:
+                intervals = calendar._work_intervals_batch(
+                    from_datetime, to_datetime, resources, domain)
+            else:
+                intervals = calendar._attendance_intervals_batch(
+                    from_datetime, to_datetime, resources)
+            for record in records:
+                resource_id = record.resource_id.id
+                day_total = hours_per_day(total_intervals[resource_id])
+                day_hours = hours_per_day(intervals[resource_id])
+                # compute number of days as quarters
+                days = sum(
+                    float_utils.round(ROUNDING_FACTOR * day_hours[day] /
+                                      day_total[day]) / ROUNDING_FACTOR
+                    for day in day_hours
+                )
+                result[record.id] = {
+                    'days': days,
+                    'hours': sum(day_hours.values()),
+                }
+        return result
+
+    def _list_leaves_batch(self, from_datetime, to_datetime, calendar=None,
+                           domain=None):
+        """
+            Batch version of `list_leaves`: the attendance and leave
+            intervals are built once per calendar for the resources of all
+            the records.
+
+            Returns a dict {id: [(day, hours, resource.calendar.leaves)]}.
+        """
+        # naive datetimes are made explicit in UTC
+        if not from_datetime.tzinfo:
+            from_datetime = from_datetime.replace(tzinfo=utc)
+        if not to_datetime.tzinfo:
+            to_datetime = to_datetime.replace(tzinfo=utc)
+        result = {}
+        for calendar, records in self._get_records_by_calendar(
+                calendar).items():
+            resources = records.mapped('resource_id')
+            attendances = calendar._attendance_intervals_batch(
+                from_datetime, to_datetime, resources)
+            leaves = calendar._leave_intervals_batch(
+                from_datetime, to_datetime, resources, domain)
+            for record in records:
+                resource_id = record.resource_id.id
+                result[record.id] = [
+                    (start.date(), (stop - start).total_seconds() / 3600, leave)
+                    for start, stop, leave in
+                    (leaves[resource_id] & attendances[resource_id])
+                ]
+        return result
@@ -20,11 +20,27 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+import csv
+import io
+import tempfile
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+try:
+    from odoo.tools.misc import xlsxwriter
+except ImportError:
+    import xlsxwriter
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+PAYSLIP_LINES_QUERY = """
+    SELECT pl.register_id, hp.number, hp.name, pl.code, pl.name,
+           pl.quantity, pl.amount, pl.total
+    FROM hr_payslip_line AS pl
+    JOIN hr_payslip AS hp ON (pl.slip_id = hp.id)
+    WHERE hp.id = ANY(%s) AND pl.register_id IN %s
+    ORDER BY pl.register_id, pl.slip_id, pl.sequence"""
 
 
 class ReportHrPayrollCommunityReportContributionRegister(models.AbstractModel):
@@ -32,23 +48,139 @@ class ReportHrPayrollCommunityReportContributionRegister(models.AbstractModel):
     _name = 'report.hr_payroll_community.report_contributionregister'
     _description = 'Payroll Contribution Register Report'
 
+    def _get_payslip_ids(self, date_from, date_to):
+        """Function for getting the done payslips of the period the user
+        can read, the queries of the lines being subject to the record
+        rules of the payslips
+        @return: list of payslip ids"""
+        return self.env['hr.payslip'].search(
+            [('date_from', '>=', date_from), ('date_to', '<=', date_to),
+             ('state', '=', 'done')]).ids
+
     def _get_payslip_lines(self, register_ids, date_from, date_to):
-        """Function for getting Payslip Lines to Contribution Register Report"""
+        """Function for getting Payslip Lines to Contribution Register Report
+        @return: {register_id: [line values]}"""
         result = {}
-        self.env.cr.execute("""
-            SELECT pl.id from hr_payslip_line as pl
-            LEFT JOIN hr_payslip AS hp on (pl.slip_id = hp.id)
-            WHERE (hp.date_from >= %s) AND (hp.date_to <= %s)
-            AND pl.register_id in %s
-            AND hp.state = 'done'
-            ORDER BY pl.slip_id, pl.sequence""",
-                            (date_from, date_to, tuple(register_ids)))
-        line_ids = [x[0] for x in self.env.cr.fetchall()]
-        for line in self.env['hr.payslip.line'].browse(line_ids):
-            result.setdefault(line.register_id.id, self.env['hr.payslip.line'])
-            result[line.register_id.id] += line
+        payslip_ids = self._get_payslip_ids(date_from, date_to)
+        if not register_ids or not payslip_ids:
+            return result
+        self.env['hr.payslip.line'].flush_model()
+        self.env['hr.payslip'].flush_model(['number', 'name'])
+        self.env.cr.execute(PAYSLIP_LINES_QUERY,
+                            (payslip_ids, tuple(register_ids)))
+        for row in self.env.cr.fetchall():
+            result.setdefault(row[0], []).append(
+                self._get_payslip_line_values(row))
         return result
 
+    def _get_payslip_line_values(self, row):
+        """Function for getting the values of a row of the payslip lines"""
+        return {
+            'slip_name': row[2],
+            'slip_number': row[1],
+            'code': row[3],
+            'name': row[4],
+            'quantity': row[5],
+            'amount': row[6],
+            'total': row[7],
+        }
+
+    def _get_payslip_lines_total(self, register_ids, date_from, date_to):
+        """Function for getting the total of the payslip lines of each
+        Contribution Register"""
+        payslip_ids = self._get_payslip_ids(date_from, date_to)
+        if not register_ids or not payslip_ids:
+            return {}
+        self.env['hr.payslip.line'].flush_model(
+            ['slip_id', 'register_id', 'total'])
+        self.env.cr.execute("""
+            SELECT pl.register_id, SUM(pl.total)
+            FROM hr_payslip_line AS pl
+            WHERE pl.slip_id = ANY(%s) AND pl.register_id IN %s
+            GROUP BY pl.register_id""",
+                            (payslip_ids, tuple(register_ids)))
+        return dict(self.env.cr.fetchall())
+
+    def _iter_payslip_lines(self, register_ids, date_from, date_to,
+                            batch_size=2000):
+        """Function for iterating over the payslip lines of the
+        Contribution Registers through a server-side cursor, so that only
+        one batch of rows is held in memory at a time
+        @return: generator of the rows of the payslip lines"""
+        payslip_ids = self._get_payslip_ids(date_from, date_to)
+        if not register_ids or not payslip_ids:
+            return
+        cr = self.env.cr
+        self.env['hr.payslip.line'].flush_model()
+        self.env['hr.payslip'].flush_model(['number', 'name'])
+        cr.execute("DECLARE contribution_register_lines NO SCROLL CURSOR "
+                   "FOR " + PAYSLIP_LINES_QUERY,
+                   (payslip_ids, tuple(register_ids)))
+        try:
+            while True:
+                cr.execute("FETCH %s FROM contribution_register_lines",
+                           (batch_size,))
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cr.execute("CLOSE contribution_register_lines")
+
+    def _get_export_header(self):
+        """Function for getting the column titles of the exported lines"""
+        return [_('Register'), _('Payslip Reference'), _('Payslip Name'),
+                _('Code'), _('Name'), _('Quantity/Rate'), _('Amount'),
+                _('Total')]
+
+    def _export_csv(self, register_ids, date_from, date_to):
+        """Function for exporting the payslip lines of the Contribution
+        Registers as CSV, encoding the rows as they are fetched
+        @return: generator of the chunks of the CSV file"""
+        register_names = {
+            register.id: register.name for register in
+            self.env['hr.contribution.register'].browse(register_ids)}
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self._get_export_header())
+        for row in self._iter_payslip_lines(register_ids, date_from, date_to):
+            writer.writerow((register_names.get(row[0], ''),) + row[1:])
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    def _export_xlsx(self, register_ids, date_from, date_to):
+        """Function for exporting the payslip lines of the Contribution
+        Registers as XLSX. The workbook is written in constant memory mode
+        into a temporary file, which is then streamed in chunks.
+        @return: generator of the chunks of the XLSX file"""
+        register_names = {
+            register.id: register.name for register in
+            self.env['hr.contribution.register'].browse(register_ids)}
+        with tempfile.TemporaryFile() as output:
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+            sheet = workbook.add_worksheet(_('Payslip Lines'))
+            bold = workbook.add_format({'bold': True})
+            sheet.write_row(0, 0, self._get_export_header(), bold)
+            row_index = 0
+            for row_index, row in enumerate(self._iter_payslip_lines(
+                    register_ids, date_from, date_to), start=1):
+                sheet.write_row(row_index, 0, (
+                    register_names.get(row[0], ''),) + row[1:])
+            if row_index:
+                sheet.write_row(row_index + 1, 5, (
+                    _('Total'), None,
+                    '=SUM(H2:H%s)' % (row_index + 1)), bold)
+            workbook.close()
+            output.seek(0)
+            while True:
+                chunk = output.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
     @api.model
     def _get_report_values(self, docids, data=None):
         """Function for getting Contribution Register Values"""
@@ -65,11 +197,8 @@ class ReportHrPayrollCommunityReportContributionRegister(models.AbstractModel):
                                                                       days=-1))[
                                    :10])
         lines_data = self._get_payslip_lines(register_ids, date_from, date_to)
-        lines_total = {}
-        for register in contrib_registers:
-            lines = lines_data.get(register.id)
-            lines_total[register.id] = lines and sum(
-                lines.mapped('total')) or 0.0
+        lines_total = self._get_payslip_lines_total(register_ids, date_from,
+                                                    date_to)
         return {
             'doc_ids': docids,
             'doc_model': 'hr.contribution.register',
@@ -29,85 +29,89 @@ class ReportHrPayrollCommunityReportPayslipDetails(models.AbstractModel):
     _description = 'Payslip Details Report'
 
     def get_details_by_rule_category(self, payslip_lines):
-        """Function for get Salary Rule Categories"""
-        PayslipLine = self.env['hr.payslip.line']
-        RuleCateg = self.env['hr.salary.rule.category']
-
-        def get_recursive_parent(current_rule_category, rule_categories=None):
-            """Function for return Rule Categories with respect to Parent
-            Category"""
-            if rule_categories:
-                rule_categories = current_rule_category | rule_categories
-            else:
-                rule_categories = current_rule_category
-            if current_rule_category.parent_id:
-                return get_recursive_parent(current_rule_category.parent_id,
-                                            rule_categories)
-            else:
-                return rule_categories
+        """Function for get Salary Rule Categories. The totals of the lines
+        are aggregated per payslip and category in a single query and the
+        parents of the categories are read from the category closure."""
         res = {}
-        result = {}
-        if payslip_lines:
-            self.env.cr.execute("""
-                SELECT pl.id, pl.category_id, pl.slip_id FROM 
-                hr_payslip_line as pl
-                LEFT JOIN hr_salary_rule_category AS rc on 
-                (pl.category_id = rc.id)
-                WHERE pl.id in %s
-                GROUP BY rc.parent_id, pl.sequence, pl.id, pl.category_id
-                ORDER BY pl.sequence, rc.parent_id""",
-                                (tuple(payslip_lines.ids),))
-            for x in self.env.cr.fetchall():
-                result.setdefault(x[2], {})
-                result[x[2]].setdefault(x[1], [])
-                result[x[2]][x[1]].append(x[0])
-            for payslip_id, lines_dict in result.items():
-                res.setdefault(payslip_id, [])
-                for rule_categ_id, line_ids in lines_dict.items():
-                    rule_categories = RuleCateg.browse(rule_categ_id)
-                    lines = PayslipLine.browse(line_ids)
-                    level = 0
-                    for parent in get_recursive_parent(rule_categories):
-                        res[payslip_id].append({
-                            'rule_category': parent.name,
-                            'name': parent.name,
-                            'code': parent.code,
-                            'level': level,
-                            'total': sum(lines.mapped('total')),
-                        })
-                        level += 1
-                    for line in lines:
-                        res[payslip_id].append({
-                            'rule_category': line.name,
-                            'name': line.name,
-                            'code': line.code,
-                            'total': line.total,
-                            'level': level
-                        })
+        if not payslip_lines:
+            return res
+        payslip_lines.flush_model(
+            ['slip_id', 'category_id', 'sequence', 'total'])
+        self.env.cr.execute("""
+            SELECT pl.slip_id, pl.category_id, SUM(pl.total),
+                   ARRAY_AGG(pl.id ORDER BY pl.sequence, pl.id)
+            FROM hr_payslip_line AS pl
+            WHERE pl.id IN %s AND pl.category_id IS NOT NULL
+            GROUP BY pl.slip_id, pl.category_id
+            ORDER BY pl.slip_id, MIN(pl.sequence), pl.category_id""",
+                            (tuple(payslip_lines.ids),))
+        category_totals = self.env.cr.fetchall()
+        ancestors = self.env['hr.salary.rule.category.closure']._get_ancestors(
+            {category_id for _slip, category_id, _total, _ids in
+             category_totals})
+        categories = {
+            category['id']: category for category in
+            self.env['hr.salary.rule.category'].browse(
+                list({ancestor_id for ancestor_ids in ancestors.values()
+                      for ancestor_id in ancestor_ids})).read(
+                ['name', 'code'])}
+        lines = {
+            line['id']: line for line in payslip_lines.read(
+                ['name', 'code', 'total'])}
+        for payslip_id, category_id, total, line_ids in category_totals:
+            details = res.setdefault(payslip_id, [])
+            level = 0
+            # from the root category down to the category of the lines
+            for ancestor_id in reversed(ancestors.get(category_id, [])):
+                category = categories[ancestor_id]
+                details.append({
+                    'rule_category': category['name'],
+                    'name': category['name'],
+                    'code': category['code'],
+                    'level': level,
+                    'total': total,
+                })
+                level += 1
+            for line_id in line_ids:
+                line = lines[line_id]
+                details.append({
+                    'rule_category': line['name'],
+                    'name': line['name'],
+                    'code': line['code'],
+                    'total': line['total'],
+                    'level': level
+                })
         return res
 
     def get_lines_by_contribution_register(self, payslip_lines):
-        """Function for getting Contribution Register Lines"""
-        result = {}
+        """Function for getting Contribution Register Lines, grouped per
+        payslip and register without building recordsets"""
         res = {}
-        for line in payslip_lines.filtered('register_id'):
-            result.setdefault(line.slip_id.id, {})
-            result[line.slip_id.id].setdefault(line.register_id, line)
-            result[line.slip_id.id][line.register_id] |= line
-        for payslip_id, lines_dict in result.items():
+        lines = [line for line in payslip_lines.read(
+            ['slip_id', 'register_id', 'name', 'code', 'quantity', 'amount',
+             'total'], load=False) if line['register_id']]
+        registers = {}
+        for line in lines:
+            registers.setdefault(line['slip_id'], {}).setdefault(
+                line['register_id'], []).append(line)
+        register_names = {
+            register.id: register.name for register in
+            self.env['hr.contribution.register'].browse(
+                list({line['register_id'] for line in lines}))}
+        for payslip_id, lines_dict in registers.items():
             res.setdefault(payslip_id, [])
-            for register, lines in lines_dict.items():
+            for register_id, register_lines in lines_dict.items():
                 res[payslip_id].append({
-                    'register_name': register.name,
-                    'total': sum(lines.mapped('total')),
+                    'register_name': register_names[register_id],
+                    'total': sum(line['total'] for line in register_lines),
                 })
-                for line in lines:
+                for line in register_lines:
                     res[payslip_id].append({
-                        'name': line.name,
-                        'code': line.code,
-                        'quantity': line.quantity,
-                        'amount': line.amount,
-                        'total': line.total,
+                        'name': line['name'],
+                        'code': line['code'],
+                        'quantity': line['quantity'],
+                        'amount': line['amount'],
+                        'total': line['total'],
                     })
         return res
 
@@ -115,16 +119,16 @@ class ReportHrPayrollCommunityReportPayslipDetails(models.AbstractModel):
     def _get_report_values(self, docids, data=None):
         """Function for getting Payslip Details Report values"""
         payslips = self.env['hr.payslip'].browse(docids)
+        payslip_lines = self.env['hr.payslip.line'].search(
+            [('slip_id', 'in', payslips.ids),
+             ('appears_on_payslip', '=', True)])
         return {
             'doc_ids': docids,
             'doc_model': 'hr.payslip',
             'docs': payslips,
             'data': data,
             'get_details_by_rule_category': self.get_details_by_rule_category(
-                payslips.mapped('details_by_salary_rule_category_ids').filtered(
-                    lambda r: r.appears_on_payslip)),
+                payslip_lines),
             'get_lines_by_contribution_register':
-                self.get_lines_by_contribution_register(
-                payslips.mapped('line_ids').filtered(
-                    lambda r: r.appears_on_payslip)),
+                self.get_lines_by_contribution_register(payslip_lines),
         }
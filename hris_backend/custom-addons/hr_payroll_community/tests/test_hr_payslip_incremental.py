@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from datetime import date
+
+from odoo.tests import common
+
+
+class TestHrPayslipIncremental(common.TransactionCase):
+    """Check the incremental computation of the payslips against the full
+    one"""
+
+    def setUp(self):
+        super(TestHrPayslipIncremental, self).setUp()
+        self.hr_employee = self.env['hr.employee'].create({
+            'name': 'Incremental Employee',
+        })
+        self.hr_salary_rule_bonus = self.env['hr.salary.rule'].create({
+            'name': 'Bonus',
+            'code': 'BONUS',
+            'sequence': 10,
+            'category_id': self.ref('hr_payroll_community.ALW'),
+            'condition_select': 'none',
+            'amount_select': 'fix',
+            'amount_fix': 100.0,
+        })
+        self.hr_structure = self.env['hr.payroll.structure'].create({
+            'name': 'Incremental Structure',
+            'code': 'INC',
+            'company_id': self.ref('base.main_company'),
+            'parent_id': self.ref('hr_payroll_community.structure_base'),
+            'rule_ids': [(6, 0, self.hr_salary_rule_bonus.ids)],
+        })
+        self.hr_contract = self.env['hr.contract'].create({
+            'name': 'Incremental Contract',
+            'wage': 5000.0,
+            'date_start': date(2024, 1, 1),
+            'employee_id': self.hr_employee.id,
+            'struct_id': self.hr_structure.id,
+        })
+        self.hr_payslip = self.env['hr.payslip'].create({
+            'name': 'Incremental Payslip',
+            'employee_id': self.hr_employee.id,
+            'contract_id': self.hr_contract.id,
+            'struct_id': self.hr_structure.id,
+            'date_from': date(2024, 3, 1),
+            'date_to': date(2024, 3, 31),
+        })
+
+    def _get_line_values(self):
+        """Function for reading the lines of the payslip, sorted by rule"""
+        lines = self.hr_payslip.line_ids.sorted(
+            lambda line: (line.salary_rule_id.id, line.contract_id.id))
+        return lines.read(
+            ['salary_rule_id', 'contract_id', 'name', 'code', 'category_id',
+             'sequence', 'appears_on_payslip', 'register_id',
+             'rule_version_id', 'amount', 'quantity', 'rate', 'total'],
+            load=False)
+
+    def test_00_incremental_after_rule_edit(self):
+        """ checking an incremental recomputation after the edition of a
+        rule gives the lines of a full one. """
+        self.hr_payslip.action_compute_sheet()
+        self.hr_salary_rule_bonus.write({
+            'name': 'Yearly Bonus',
+            'sequence': 50,
+            'amount_fix': 250.0,
+            'category_id': self.ref('hr_payroll_community.Other'),
+        })
+        # The rule shares the write date of the test transaction, forget
+        # the fingerprint so that the payslip is recomputed
+        self.hr_payslip.compute_fingerprint = False
+        self.hr_payslip.with_context(
+            payslip_incremental=True).action_compute_sheet()
+        incremental_values = self._get_line_values()
+        bonus = [vals for vals in incremental_values if vals['code'] == 'BONUS']
+        self.assertEqual(len(bonus), 1)
+        self.assertEqual(bonus[0]['name'], 'Yearly Bonus')
+        self.assertEqual(bonus[0]['sequence'], 50)
+        self.assertEqual(bonus[0]['amount'], 250.0)
+        self.hr_payslip.action_compute_sheet()
+        full_values = self._get_line_values()
+        for vals in incremental_values + full_values:
+            vals.pop('id')
+        self.assertEqual(incremental_values, full_values)
@@ -22,6 +22,7 @@
 #############################################################################
 from datetime import datetime
 from dateutil import relativedelta
+from urllib.parse import urlencode
 
 from odoo import fields, models
 
@@ -43,7 +44,7 @@ class PayslipLinesContributionRegister(models.TransientModel):
 
     def action_print_report(self):
         """Function for Print Report"""
-        active_ids = secontribution_register_actionlf.env.context.get('active_ids', [])
+        active_ids = self.env.context.get('active_ids', [])
         datas = {
             'ids': active_ids,
             'model': 'hr.contribution.register',
@@ -52,3 +53,28 @@ class PayslipLinesContributionRegister(models.TransientModel):
         return (self.env.ref(
             'hr_payroll_community.contribution_register_action')
                 .report_action([], data=datas))
+
+    def action_export_csv(self):
+        """Function for exporting the payslip lines as CSV"""
+        return self._action_export('csv')
+
+    def action_export_xlsx(self):
+        """Function for exporting the payslip lines as XLSX"""
+        return self._action_export('xlsx')
+
+    def _action_export(self, output_format):
+        """Function for downloading the streamed export of the payslip lines
+        of the selected Contribution Registers"""
+        self.ensure_one()
+        active_ids = self.env.context.get('active_ids', [])
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/hr_payroll_community/contribution_register/export?%s' %
+                   urlencode({
+                       'register_ids': ','.join(map(str, active_ids)),
+                       'date_from': self.date_from,
+                       'date_to': self.date_to,
+                       'output_format': output_format,
+                   }),
+            'target': 'self',
+        }
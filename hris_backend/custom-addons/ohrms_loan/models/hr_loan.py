@@ -20,10 +20,11 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import create_index
+from .hr_loan_schedule import compute_schedule
 
 
 class HrLoan(models.Model):
@@ -81,6 +82,15 @@ class HrLoan(models.Model):
                                    help="Job position of the employee")
     loan_amount = fields.Float(string="Loan Amount", required=True,
                                help="Loan amount")
+    schedule_method = fields.Selection(
+        [('equal_principal', 'Equal Principal'),
+         ('annuity', 'Equal Installments')], string="Repayment Method",
+        required=True, default='equal_principal',
+        help="Equal Principal repays the same part of the loan every month "
+             "with a decreasing interest, Equal Installments keeps the "
+             "monthly amount constant.")
+    interest_rate = fields.Float(string="Interest Rate (%)",
+                                 help="Yearly interest rate of the loan")
     total_amount = fields.Float(string="Total Amount", store=True,
                                 readonly=True, compute='_compute_total_amount',
                                 help="The total amount of the loan")
@@ -99,16 +109,20 @@ class HrLoan(models.Model):
          ], string="State", default='draft', help="The current state of the "
                                                   "loan request.", copy=False)
 
+    @api.depends('loan_amount', 'loan_lines.amount', 'loan_lines.paid',
+                 'loan_lines.interest_amount')
     def _compute_total_amount(self):
-        """ Compute total loan amount,balance amount and total paid amount"""
-        total_paid = 0.0
+        """ Compute total loan amount,balance amount and total paid amount.
+            The installments are read through the relation, so that the
+            unsaved ones of the form are taken into account, the prefetching
+            reading those of all the loans at once."""
         for loan in self:
-            for line in loan.loan_lines:
-                if line.paid:
-                    total_paid += line.amount
-            balance_amount = loan.loan_amount - total_paid
-            loan.total_amount = loan.loan_amount
-            loan.balance_amount = balance_amount
+            lines = loan.loan_lines
+            total_paid = sum(lines.filtered('paid').mapped('amount'))
+            total_amount = loan.loan_amount + sum(
+                lines.mapped('interest_amount'))
+            loan.total_amount = total_amount
+            loan.balance_amount = total_amount - total_paid
             loan.total_paid_amount = total_paid
 
     @api.model
@@ -130,21 +144,56 @@ class HrLoan(models.Model):
     def action_compute_installment(self):
         """This automatically create the installment the employee need to pay to
             company based on payment start date and the no of installments.
+            The schedules of all the loans are computed together: the unpaid
+            installments are removed at once and the new ones created by a
+            single create(). Paid installments are kept and the outstanding
+            principal is spread over the remaining installments, so that the
+            schedules of running loans can be recomputed after a change of
+            policy. The computation is refused while a payslip in progress
+            deducts one of the unpaid installments, which would otherwise be
+            deleted under it.
             """
+        unpaid_lines = self.loan_lines.filtered(lambda line: not line.paid)
+        payslip_inputs = self.env['hr.payslip.input'].search(
+            [('loan_line_id', 'in', unpaid_lines.ids),
+             ('payslip_id.state', 'not in', ('done', 'cancel'))])
+        if payslip_inputs:
+            raise UserError(_(
+                "The installments of the loans %s are deducted by the "
+                "payslips %s. Cancel the payslips or remove their loan "
+                "input before computing the installments again.") % (
+                ', '.join(payslip_inputs.loan_line_id.loan_id.mapped('name')),
+                ', '.join(payslip_inputs.payslip_id.mapped(
+                    lambda slip: slip.number or slip.name))))
+        unpaid_lines.unlink()
+        vals_list = []
         for loan in self:
-            loan.loan_lines.unlink()
-            date_start = datetime.strptime(str(loan.payment_date), '%Y-%m-%d')
-            amount = loan.loan_amount / loan.installment
-            for i in range(1, loan.installment + 1):
-                self.env['hr.loan.line'].create({
-                    'date': date_start,
-                    'amount': amount,
-                    'employee_id': loan.employee_id.id,
-                    'loan_id': loan.id})
-                date_start = date_start + relativedelta(months=1)
-            loan._compute_total_amount()
+            vals_list += loan._prepare_installment_values()
+        self.env['hr.loan.line'].create(vals_list)
         return True
 
+    def _prepare_installment_values(self):
+        """ Values of the unpaid installments of the loan
+            :return: list of values of hr.loan.line"""
+        self.ensure_one()
+        paid_lines = self.loan_lines.filtered('paid')
+        outstanding = self.loan_amount - sum(
+            line.principal_amount or line.amount for line in paid_lines)
+        schedule = compute_schedule(
+            outstanding, self.installment - len(paid_lines),
+            method=self.schedule_method, annual_rate=self.interest_rate,
+            precision_rounding=self.currency_id.rounding or 0.01)
+        date_start = self.payment_date + relativedelta(
+            months=len(paid_lines))
+        return [{
+            'date': date_start + relativedelta(months=index),
+            'amount': principal + interest,
+            'principal_amount': principal,
+            'interest_amount': interest,
+            'employee_id': self.employee_id.id,
+            'loan_id': self.id,
+        } for index, (principal, interest) in enumerate(schedule)]
+
     def action_refuse(self):
         """ Function to reject loan request"""
         return self.write({'state': 'refuse'})
@@ -186,6 +235,12 @@ class HrLoanLine(models.Model):
     employee_id = fields.Many2one('hr.employee', string="Employee",
                                   help="Employee")
     amount = fields.Float(string="Amount", required=True, help="Amount")
+    principal_amount = fields.Float(string="Principal",
+                                    help="Part of the installment repaying "
+                                         "the loan amount")
+    interest_amount = fields.Float(string="Interest",
+                                   help="Part of the installment paying the "
+                                        "interest of the loan")
     paid = fields.Boolean(string="Paid", help="Indicates whether the "
                                               "installment has been paid.")
     loan_id = fields.Many2one('hr.loan', string="Loan Ref.",
@@ -193,3 +248,36 @@ class HrLoanLine(models.Model):
     payslip_id = fields.Many2one('hr.payslip', string="Payslip Ref.",
                                  help="Reference to the associated "
                                       "payslip, if any.")
+
+    def init(self):
+        """ Index the installments on the columns searched for the due
+            installments of the payslips"""
+        create_index(self._cr, 'hr_loan_line_employee_date_paid_index',
+                     self._table, ['employee_id', 'date', 'paid'])
+
+    @api.model
+    def _get_due_installments(self, employee_ids, date_from, date_to):
+        """ Find the unpaid installments of approved loans falling in a
+            payslip period, for all the given employees in one query. When
+            an employee has several due installments the one of the latest
+            loan is kept, as the payslip has a single loan input.
+            :param employee_ids: ids of the employees
+            :param date_from: Start date of the payslip period
+            :param date_to: End date of the payslip period
+            :return: {employee_id: hr.loan.line}"""
+        if not employee_ids:
+            return {}
+        self.flush_model(['employee_id', 'date', 'paid', 'loan_id'])
+        self.env['hr.loan'].flush_model(['state'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (line.employee_id) line.employee_id, line.id
+            FROM hr_loan_line AS line
+            JOIN hr_loan AS loan ON (loan.id = line.loan_id)
+            WHERE line.employee_id IN %s
+            AND line.date BETWEEN %s AND %s
+            AND line.paid IS NOT TRUE
+            AND loan.state = 'approve'
+            ORDER BY line.employee_id, line.loan_id DESC, line.id DESC""",
+                            (tuple(employee_ids), date_from, date_to))
+        return {employee_id: self.browse(line_id)
+                for employee_id, line_id in self.env.cr.fetchall()}
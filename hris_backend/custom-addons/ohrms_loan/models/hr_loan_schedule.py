@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+
+from odoo.tools import float_round
+
+_logger = logging.getLogger(__name__)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    _logger.debug('Cannot `import numpy`, the loan schedules are computed '
+                  'installment by installment.')
+
+
+def compute_schedule(principal, count, method='equal_principal',
+                     annual_rate=0.0, precision_rounding=0.01):
+    """ Compute the amortization schedule of a loan.
+        :param principal: amount lent
+        :param count: number of monthly installments
+        :param method: 'equal_principal' repays the same principal every
+        month, the interest decreasing with the balance; 'annuity' keeps the
+        installments equal
+        :param annual_rate: yearly interest rate in percent
+        :param precision_rounding: rounding of the currency of the loan
+        :return: list of (principal, interest) of every installment, rounded,
+        the rounding remainders being carried by the last installment"""
+    if count <= 0:
+        return []
+    rate = annual_rate / 100.0 / 12
+    if numpy is not None:
+        principals, interests = _compute_schedule_vector(principal, count,
+                                                         method, rate)
+    else:
+        principals, interests = _compute_schedule_rows(principal, count,
+                                                       method, rate)
+    total_principal = float_round(principal,
+                                  precision_rounding=precision_rounding)
+    total_interest = float_round(sum(interests),
+                                 precision_rounding=precision_rounding)
+    principals = [float_round(amount, precision_rounding=precision_rounding)
+                  for amount in principals[:-1]]
+    interests = [float_round(amount, precision_rounding=precision_rounding)
+                 for amount in interests[:-1]]
+    principals.append(float_round(total_principal - sum(principals),
+                                  precision_rounding=precision_rounding))
+    interests.append(float_round(total_interest - sum(interests),
+                                 precision_rounding=precision_rounding))
+    return list(zip(principals, interests))
+
+
+def _compute_schedule_vector(principal, count, method, rate):
+    """ Compute the unrounded schedule with array operations"""
+    periods = numpy.arange(count)
+    if method == 'annuity' and rate:
+        payment = principal * rate / (1 - (1 + rate) ** -count)
+        # balance left at the beginning of every period
+        balances = principal * (1 + rate) ** periods - payment * (
+                ((1 + rate) ** periods - 1) / rate)
+        interests = balances * rate
+        principals = payment - interests
+    else:
+        principals = numpy.full(count, principal / count)
+        interests = (principal - principals[0] * periods) * rate
+    return principals.tolist(), interests.tolist()
+
+
+def _compute_schedule_rows(principal, count, method, rate):
+    """ Compute the unrounded schedule period by period"""
+    principals = []
+    interests = []
+    balance = principal
+    if method == 'annuity' and rate:
+        payment = principal * rate / (1 - (1 + rate) ** -count)
+    for _period in range(count):
+        interest = balance * rate
+        if method == 'annuity' and rate:
+            amount = payment - interest
+        else:
+            amount = principal / count
+        principals.append(amount)
+        interests.append(interest)
+        balance -= amount
+    return principals, interests
@@ -28,6 +28,15 @@ class HrPayslip(models.Model):
     additional functionality related to employee loans."""
     _inherit = 'hr.payslip'
 
+    def _prepare_payslip_run_values(self, payslip_run, employees):
+        """ Look up the due loan installments of all the employees of the
+            batch at once, for get_inputs to read them from the context"""
+        installments = self.env['hr.loan.line']._get_due_installments(
+            employees.ids, payslip_run.date_start, payslip_run.date_end)
+        return super(HrPayslip, self.with_context(
+            loan_due_installments=installments)
+                     )._prepare_payslip_run_values(payslip_run, employees)
+
     def get_inputs(self, contract_ids, date_from, date_to):
         """Compute additional inputs for the employee payslip,
         considering active loans.
@@ -38,26 +47,23 @@ class HrPayslip(models.Model):
         the payslip."""
         res = super(HrPayslip, self).get_inputs(contract_ids, date_from,
                                                 date_to)
-        employee_id = self.env['hr.contract'].browse(
-            contract_ids[0].id).employee_id if contract_ids \
+        employee_id = contract_ids[:1].employee_id if contract_ids \
             else self.employee_id
-        loan_id = self.env['hr.loan'].search(
-            [('employee_id', '=', employee_id.id), ('state', '=', 'approve')])
-        for loan in loan_id:
-            for loan_line in loan.loan_lines:
-                if (date_from <= loan_line.date <= date_to and
-                        not loan_line.paid):
-                    for result in res:
-                        if result.get('code') == 'LO':
-                            result['amount'] = loan_line.amount
-                            result['loan_line_id'] = loan_line.id
+        installments = self.env.context.get('loan_due_installments')
+        if installments is None:
+            installments = self.env['hr.loan.line']._get_due_installments(
+                employee_id.ids, date_from, date_to)
+        loan_line = installments.get(employee_id.id)
+        if loan_line:
+            for result in res:
+                if result.get('code') == 'LO':
+                    result['amount'] = loan_line.amount
+                    result['loan_line_id'] = loan_line.id
         return res
 
     def action_payslip_done(self):
-        """ Compute the loan amount and remaining amount while confirming
-            the payslip"""
-        for line in self.input_line_ids:
-            if line.loan_line_id:
-                line.loan_line_id.paid = True
-                line.loan_line_id.loan_id._compute_total_amount()
+        """ Mark the loan installments of the payslips paid while confirming
+            them. The installments are written at once and the totals of
+            their loans recomputed together."""
+        self.input_line_ids.loan_line_id.write({'paid': True})
         return super(HrPayslip, self).action_payslip_done()
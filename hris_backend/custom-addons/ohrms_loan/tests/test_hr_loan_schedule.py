@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from unittest.mock import patch
+
+from odoo.tests import common
+from odoo.tools import float_compare
+
+from ..models import hr_loan_schedule
+from ..models.hr_loan_schedule import compute_schedule
+
+# (principal, count, method, annual_rate) of the checked schedules
+SCHEDULE_CASES = [
+    (12000.0, 12, 'equal_principal', 0.0),
+    (1000.0, 3, 'equal_principal', 0.0),
+    (1000.0, 3, 'annuity', 0.0),
+    (25000.0, 24, 'equal_principal', 7.5),
+    (25000.0, 24, 'annuity', 7.5),
+    (999.99, 7, 'annuity', 12.0),
+]
+
+
+class TestHrLoanSchedule(common.TransactionCase):
+    """ Check the amortization schedules of the loans"""
+
+    def _compute_without_numpy(self, *args, **kwargs):
+        """ Compute a schedule with the installment by installment
+            fallback"""
+        with patch.object(hr_loan_schedule, 'numpy', None):
+            return compute_schedule(*args, **kwargs)
+
+    def test_00_vector_matches_rows(self):
+        """ checking the NumPy schedule matches the fallback one. """
+        if hr_loan_schedule.numpy is None:
+            self.skipTest("NumPy is not installed")
+        for principal, count, method, annual_rate in SCHEDULE_CASES:
+            rate = annual_rate / 100.0 / 12
+            vector = hr_loan_schedule._compute_schedule_vector(
+                principal, count, method, rate)
+            rows = hr_loan_schedule._compute_schedule_rows(
+                principal, count, method, rate)
+            for vector_amounts, row_amounts in zip(vector, rows):
+                for vector_amount, row_amount in zip(vector_amounts,
+                                                     row_amounts):
+                    self.assertAlmostEqual(vector_amount, row_amount,
+                                           places=6)
+            self.assertEqual(
+                compute_schedule(principal, count, method, annual_rate),
+                self._compute_without_numpy(principal, count, method,
+                                            annual_rate))
+
+    def test_01_equal_split_without_interest(self):
+        """ checking a loan without interest is split in equal installments
+            like before the schedules. """
+        for compute in (compute_schedule, self._compute_without_numpy):
+            schedule = compute(1000.0, 3, 'equal_principal', 0.0)
+            self.assertEqual(schedule, [(333.33, 0.0), (333.33, 0.0),
+                                        (333.34, 0.0)])
+            schedule = compute(12000.0, 12, 'annuity', 0.0)
+            self.assertEqual(schedule, [(12000.0 / 12, 0.0)] * 12)
+
+    def test_02_principals_sum_to_loan_amount(self):
+        """ checking the rounding remainder carried by the last installment
+            makes the principals sum to the loan amount. """
+        for compute in (compute_schedule, self._compute_without_numpy):
+            for principal, count, method, annual_rate in SCHEDULE_CASES:
+                schedule = compute(principal, count, method, annual_rate)
+                self.assertEqual(len(schedule), count)
+                self.assertEqual(float_compare(
+                    sum(amount for amount, _interest in schedule), principal,
+                    precision_rounding=0.01), 0)
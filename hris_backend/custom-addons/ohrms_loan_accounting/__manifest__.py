@@ -36,6 +36,7 @@
     ],
     'data': [
         'security/ohrms_loan_accounting_security.xml',
+        'data/ir_cron_data.xml',
         'views/res_config_settings_views.xml',
         'views/hr_loan_views.xml',
     ],
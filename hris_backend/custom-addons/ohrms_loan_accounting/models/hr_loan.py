@@ -21,7 +21,8 @@
 #
 #############################################################################
 from datetime import date
-from odoo import fields, models
+from dateutil.relativedelta import relativedelta
+from odoo import fields, models, _
 from odoo.exceptions import UserError
 
 
@@ -161,44 +162,161 @@ class HrLoanLineAcc(models.Model):
     """ Creating account move for while confirm the loan lines"""
     _inherit = "hr.loan.line"
 
+    move_id = fields.Many2one('account.move', string="Journal Entry",
+                              readonly=True, copy=False,
+                              help="Journal entry posting the installment")
+
+    def init(self):
+        """ Link the paid installments posted one by one before the move_id
+            field existed to their journal entries, so that the batch
+            posting does not post them again. The installment entries debit
+            the loan account on a line of the loan, unlike the loan
+            approval entries, and are matched to the paid installments of
+            the loan in the order of their dates."""
+        self.env.cr.execute("""
+            WITH moves AS (
+                SELECT DISTINCT aml.move_id, aml.loan_id
+                FROM account_move_line aml
+                JOIN hr_loan loan ON loan.id = aml.loan_id
+                WHERE aml.account_id = loan.employee_account_id
+                AND aml.debit > 0
+                AND NOT EXISTS (SELECT 1 FROM hr_loan_line posted
+                                WHERE posted.move_id = aml.move_id)
+            ), ranked_moves AS (
+                SELECT move_id, loan_id, ROW_NUMBER() OVER (
+                    PARTITION BY loan_id ORDER BY move_id) AS rank
+                FROM moves
+            ), ranked_lines AS (
+                SELECT id, loan_id, ROW_NUMBER() OVER (
+                    PARTITION BY loan_id ORDER BY date, id) AS rank
+                FROM hr_loan_line
+                WHERE paid AND move_id IS NULL
+            )
+            UPDATE hr_loan_line line SET move_id = ranked_moves.move_id
+            FROM ranked_lines
+            JOIN ranked_moves ON ranked_moves.loan_id = ranked_lines.loan_id
+                AND ranked_moves.rank = ranked_lines.rank
+            WHERE line.id = ranked_lines.id""")
+
+    def _check_postable(self):
+        """ Check that the installments can be posted"""
+        if self.filtered(lambda line: line.loan_id.state != 'approve'):
+            raise UserError("Loan Request must be approved")
+
     def action_paid_amount(self, month):
         """This creates the account move line for payment of each installment.
+            All the moves are created together and posted at once.
             """
+        self._check_postable()
+        lines = self.filtered(lambda line: not line.move_id)
         timenow = date.today()
-        for line in self:
-            if line.loan_id.state != 'approve':
-                raise UserError("Loan Request must be approved")
+        vals_list = []
+        for line in lines:
             amount = line.amount
             loan_name = line.employee_id.name
-            reference = line.loan_id.name
             journal_id = line.loan_id.journal_id.id
-            debit_account_id = line.loan_id.employee_account_id.id
-            credit_account_id = line.loan_id.treasury_account_id.id
-            name = 'LOAN/' + ' ' + loan_name + '/' + month
             debit_vals = {
                 'name': loan_name,
-                'account_id': debit_account_id,
+                'account_id': line.loan_id.employee_account_id.id,
                 'journal_id': journal_id,
                 'date': timenow,
                 'debit': amount > 0.0 and amount or 0.0,
                 'credit': amount < 0.0 and -amount or 0.0,
+                'loan_id': line.loan_id.id,
             }
             credit_vals = {
                 'name': loan_name,
-                'account_id': credit_account_id,
+                'account_id': line.loan_id.treasury_account_id.id,
                 'journal_id': journal_id,
                 'date': timenow,
                 'debit': amount < 0.0 and -amount or 0.0,
                 'credit': amount > 0.0 and amount or 0.0,
+                'loan_id': line.loan_id.id,
             }
-            vals = {
-                'name': name,
+            vals_list.append({
+                'name': 'LOAN/ %s/%s' % (loan_name, month),
                 'narration': loan_name,
-                'ref': reference,
+                'ref': line.loan_id.name,
                 'journal_id': journal_id,
                 'date': timenow,
                 'line_ids': [(0, 0, debit_vals), (0, 0, credit_vals)]
-            }
-            move = self.env['account.move'].create(vals)
-            move.action_post()
+            })
+        moves = self.env['account.move'].create(vals_list)
+        moves.action_post()
+        for line, move in zip(lines, moves):
+            line.write({'move_id': move.id})
         return True
+
+    def action_post_batch(self, ref, move_date=None):
+        """ Post the installments by consolidated moves, one per journal,
+            loan account and treasury account, with a line per employee
+            and loan on the loan account balanced by a single treasury line.
+            All the moves are created by one create() and posted at once.
+            :param ref: reference of the moves, e.g. the posted period
+            :param move_date: accounting date of the moves
+            :return: the posted moves"""
+        self._check_postable()
+        lines = self.filtered(lambda line: not line.move_id)
+        move_date = move_date or date.today()
+        groups = {}
+        for line in lines:
+            loan = line.loan_id
+            key = (loan.journal_id, loan.employee_account_id,
+                   loan.treasury_account_id)
+            groups[key] = groups.get(key, self.browse()) | line
+        vals_list = []
+        group_lines = []
+        for (journal, employee_account, treasury_account), installments \
+                in groups.items():
+            amounts = {}
+            for line in installments:
+                key = (line.employee_id, line.loan_id)
+                amounts[key] = amounts.get(key, 0.0) + line.amount
+            total = sum(amounts.values())
+            move_lines = [(0, 0, {
+                'name': employee.name,
+                'partner_id': employee.work_contact_id.id,
+                'account_id': employee_account.id,
+                'debit': amount > 0.0 and amount or 0.0,
+                'credit': amount < 0.0 and -amount or 0.0,
+                'loan_id': loan.id,
+            }) for (employee, loan), amount in amounts.items()]
+            move_lines.append((0, 0, {
+                'name': _('Loan Installments %s') % ref,
+                'account_id': treasury_account.id,
+                'debit': total < 0.0 and -total or 0.0,
+                'credit': total > 0.0 and total or 0.0,
+            }))
+            vals_list.append({
+                'ref': _('Loan Installments %s') % ref,
+                'journal_id': journal.id,
+                'date': move_date,
+                'line_ids': move_lines,
+            })
+            group_lines.append(installments)
+        moves = self.env['account.move'].create(vals_list)
+        moves.action_post()
+        for installments, move in zip(group_lines, moves):
+            installments.write({'move_id': move.id})
+        return moves
+
+    def _cron_post_installments(self):
+        """ Post in batch the installments paid by the payslips up to the
+            end of the previous month, when the batch posting is enabled"""
+        if not self.env['ir.config_parameter'].sudo().get_param(
+                'account.loan_batch_posting'):
+            return
+        self._post_due_installments(
+            date.today().replace(day=1) - relativedelta(days=1))
+
+    def _post_due_installments(self, date_to):
+        """ Post in batch all the paid and not yet posted installments due
+            until a date, catching up on the ones paid or dated after the
+            previous runs
+            :return: the posted moves"""
+        lines = self.search([('date', '<=', date_to),
+                             ('paid', '=', True),
+                             ('move_id', '=', False),
+                             ('loan_id.state', '=', 'approve')])
+        return lines.action_post_batch(_('until %s') % date_to,
+                                       move_date=date_to)
@@ -30,15 +30,24 @@ class HrPayslipAcc(models.Model):
     _inherit = 'hr.payslip'
 
     def action_payslip_done(self):
-        """ Calculate the dates and make the status as done"""
-        for line in self.input_line_ids:
-            date_from = self.date_from
-            tym = datetime.combine(fields.Date.from_string(date_from),
-                                   time.min)
+        """ Calculate the dates and make the status as done. The loan
+            installments are posted at once, or left to the monthly batch
+            posting when it is enabled."""
+        if not self.env['ir.config_parameter'].sudo().get_param(
+                'account.loan_batch_posting'):
             locale = self.env.context.get('lang') or 'en_US'
-            month = tools.ustr(
-                babel.dates.format_date(date=tym, format='MMMM-y',
-                                        locale=locale))
-            if line.loan_line_id:
-                line.loan_line_id.action_paid_amount(month)
+            installments_by_month = {}
+            for payslip in self:
+                tym = datetime.combine(
+                    fields.Date.from_string(payslip.date_from), time.min)
+                month = tools.ustr(
+                    babel.dates.format_date(date=tym, format='MMMM-y',
+                                            locale=locale))
+                installments_by_month.setdefault(
+                    month, self.env['hr.loan.line'])
+                installments_by_month[month] |= \
+                    payslip.input_line_ids.loan_line_id
+            for month, installments in installments_by_month.items():
+                if installments:
+                    installments.action_paid_amount(month)
         return super(HrPayslipAcc, self).action_payslip_done()
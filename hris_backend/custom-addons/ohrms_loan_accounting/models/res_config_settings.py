@@ -30,6 +30,10 @@ class AccConfig(models.TransientModel):
     loan_approve = fields.Boolean(default=False,
                                   string="Approval from Accounting Department",
                                   help="Loan Approval from account manager")
+    loan_batch_posting = fields.Boolean(
+        default=False, string="Monthly Posting of Loan Installments",
+        help="Post the installments paid by the payslips once a month, in "
+             "consolidated journal entries")
 
     @api.model
     def get_values(self):
@@ -37,7 +41,9 @@ class AccConfig(models.TransientModel):
         res = super(AccConfig, self).get_values()
         res.update(
             loan_approve=self.env['ir.config_parameter'].sudo().get_param(
-                'account.loan_approve'))
+                'account.loan_approve'),
+            loan_batch_posting=self.env['ir.config_parameter'].sudo(
+            ).get_param('account.loan_batch_posting'))
         return res
 
     def set_values(self):
@@ -45,3 +51,5 @@ class AccConfig(models.TransientModel):
         super(AccConfig, self).set_values()
         self.env['ir.config_parameter'].sudo().set_param(
             'account.loan_approve', self.loan_approve)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'account.loan_batch_posting', self.loan_batch_posting)
@@ -28,25 +28,29 @@ class HrPayslip(models.Model):
         inorder to add details of advance salary in the payslip."""
     _inherit = 'hr.payslip'
 
+    def _prepare_payslip_run_values(self, payslip_run, employees):
+        """Sum the advances of all the employees of the batch at once, for
+           get_inputs() to read them from the context."""
+        advances = self.env['salary.advance']._get_period_advances(
+            employees.ids, payslip_run.date_start, payslip_run.date_end)
+        return super(HrPayslip, self.with_context(
+            salary_advance_amounts=advances)
+                     )._prepare_payslip_run_values(payslip_run, employees)
+
     def get_inputs(self, contract_ids, date_from, date_to):
         """Supering get_inputs() method inorder to add details of advance
            salary in the payslip."""
         res = super(HrPayslip, self).get_inputs(contract_ids, date_from,
                                                 date_to)
-        employee_id = self.env['hr.contract'].browse(
-            contract_ids[0].id).employee_id if contract_ids \
+        employee_id = contract_ids[:1].employee_id if contract_ids \
             else self.employee_id
-        advance_salary = self.env['salary.advance'].search(
-            [('employee_id', '=', employee_id.id)])
-        for record in advance_salary:
-            current_date = date_from.month
-            date = record.date
-            existing_date = date.month
-            if current_date == existing_date:
-                state = record.state
-                amount = record.advance
-                for result in res:
-                    if state == 'approve' and amount != 0 and result.get(
-                            'code') == 'SAR':
-                        result['amount'] = amount
+        advances = self.env.context.get('salary_advance_amounts')
+        if advances is None:
+            advances = self.env['salary.advance']._get_period_advances(
+                employee_id.ids, date_from, date_to)
+        amount = advances.get(employee_id.id)
+        if amount:
+            for result in res:
+                if result.get('code') == 'SAR':
+                    result['amount'] = amount
         return res
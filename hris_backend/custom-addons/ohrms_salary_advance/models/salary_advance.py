@@ -20,11 +20,12 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from datetime import datetime
 import time
+from dateutil.relativedelta import relativedelta
 from odoo import exceptions
 from odoo.exceptions import UserError
 from odoo import api, fields, models, _
+from odoo.tools import create_index
 
 
 class SalaryAdvance(models.Model):
@@ -42,6 +43,10 @@ class SalaryAdvance(models.Model):
     date = fields.Date(string='Date', required=True,
                        default=lambda self: fields.Date.today(),
                        help="Submit date of the advanced salary.")
+    period = fields.Date(string='Pay Period', compute='_compute_period',
+                         store=True,
+                         help="First day of the month the advance is paid "
+                              "back in.")
     reason = fields.Text(string='Reason', help="Reason for the advance salary"
                                                " request.")
     currency_id = fields.Many2one('res.currency', string='Currency',
@@ -85,6 +90,45 @@ class SalaryAdvance(models.Model):
                                            help='Running contract of the '
                                                 'employee.')
 
+    def init(self):
+        """Index the advances on the columns searched by the payslips and
+         the approval checks."""
+        create_index(self._cr, 'salary_advance_employee_period_state_index',
+                     self._table, ['employee_id', 'period', 'state'])
+
+    @api.depends('date')
+    def _compute_period(self):
+        """Normalize the date of the advance to its pay period."""
+        for advance in self:
+            advance.period = advance.date and advance.date.replace(day=1)
+
+    @api.model
+    def _get_period_advances(self, employee_ids, date_from, date_to):
+        """Sum the approved advances of the employees whose pay period falls
+         between two dates, for all the employees in one query.
+        :param employee_ids: ids of the employees
+        :param date_from: Start date of the payslip period
+        :param date_to: End date of the payslip period
+        :return: {employee_id: advance amount}"""
+        if not employee_ids:
+            return {}
+        return {
+            employee.id: amount for employee, amount in self._read_group(
+                [('employee_id', 'in', list(employee_ids)),
+                 ('period', '>=', date_from.replace(day=1)),
+                 ('period', '<=', date_to),
+                 ('state', '=', 'approve')],
+                ['employee_id'], ['advance:sum'])}
+
+    def _check_period_advance(self):
+        """Check that no other advance is approved for the pay period of the
+         advance."""
+        if self.search_count([('employee_id', '=', self.employee_id.id),
+                              ('period', '=', self.period),
+                              ('id', '!=', self.id),
+                              ('state', '=', 'approve')], limit=1):
+            raise UserError('Advance can be requested once in a month')
+
     @api.onchange('company_id')
     def _onchange_company_id(self):
         """This method will trigger when there is a change in company_id."""
@@ -122,16 +166,7 @@ class SalaryAdvance(models.Model):
         if not self.employee_id.address_id.id:
             raise UserError('Define home address for the employee. i.e address'
                             ' under private information of the employee.')
-        salary_advance_search = self.search(
-            [('employee_id', '=', self.employee_id.id), ('id', '!=', self.id),
-             ('state', '=', 'approve')])
-        current_month = datetime.strptime(str(self.date),
-                                          '%Y-%m-%d').date().month
-        for each_advance in salary_advance_search:
-            existing_month = datetime.strptime(str(each_advance.date),
-                                               '%Y-%m-%d').date().month
-            if current_month == existing_month:
-                raise UserError('Advance can be requested once in a month')
+        self._check_period_advance()
         if not self.employee_contract_id:
             raise UserError('Define a contract for the employee')
         if (self.advance > self.employee_contract_id.wage
@@ -146,36 +181,25 @@ class SalaryAdvance(models.Model):
              ('date_to', '>=', self.date)])
         if payslip_ids:
             raise UserError("This month salary already calculated")
-        for slip in self.env['hr.payslip'].search(
-                [('employee_id', '=', self.employee_id.id)]):
-            slip_moth = datetime.strptime(str(slip.date_from),
-                                          '%Y-%m-%d').date().month
-            if current_month == slip_moth + 1:
-                slip_day = datetime.strptime(str(slip.date_from),
-                                             '%Y-%m-%d').date().day
-                current_day = datetime.strptime(str(self.date),
-                                                '%Y-%m-%d').date().day
-                if (current_day - slip_day < self.
-                        employee_contract_id.struct_id.advance_date):
-                    raise exceptions.UserError(
-                        _('Request can be done after "%s" Days From prevoius'
-                          ' month salary') % self.
-                        employee_contract_id.struct_id.advance_date)
+        # the latest payslip of the previous pay period is the one closest
+        # to the request
+        slip = self.env['hr.payslip'].search(
+            [('employee_id', '=', self.employee_id.id),
+             ('date_from', '>=', self.period - relativedelta(months=1)),
+             ('date_from', '<', self.period)],
+            order='date_from desc', limit=1)
+        if slip and (self.date.day - slip.date_from.day < self.
+                     employee_contract_id.struct_id.advance_date):
+            raise exceptions.UserError(
+                _('Request can be done after "%s" Days From prevoius'
+                  ' month salary') % self.
+                employee_contract_id.struct_id.advance_date)
         self.state = 'waiting_approval'
 
     def approve_request_acc_dept(self):
         """This Approves the employee salary advance request from accounting
          department."""
-        salary_advance_search = self.search(
-            [('employee_id', '=', self.employee_id.id), ('id', '!=', self.id),
-             ('state', '=', 'approve')])
-        current_month = datetime.strptime(str(self.date),
-                                          '%Y-%m-%d').date().month
-        for each_advance in salary_advance_search:
-            existing_month = datetime.strptime(str(each_advance.date),
-                                               '%Y-%m-%d').date().month
-            if current_month == existing_month:
-                raise UserError('Advance can be requested once in a month')
+        self._check_period_advance()
         if not self.debit or not self.credit or not self.journal:
             raise UserError("You must enter Debit & Credit account and"
                             " journal to approve ")